@@ -3,36 +3,219 @@ Flask Web API for Deepfake Detection
 Audio deepfake detection using FFT Phase Geometry & Complex Linear Algebra
 """
 
-from flask import Flask, request, jsonify
+from flask import (Flask, Blueprint, Response, current_app, request, jsonify,
+                   stream_with_context)
 from flask_cors import CORS
 import os
 import tempfile
+import tarfile
+import zipfile
 from pathlib import Path
 import json
 
-from detector import DeepfakeDetector
+from detector import DeepfakeDetector, PROGRESSIVE_STRATEGIES
+from signal_processor import AudioSignalProcessor
 from reference_stats import compute_and_save_reference_stats
+from prediction_cache import PredictionCache, content_key, file_content_key
+from jobs import JobManager, MemoryJobStore, SQLiteJobStore, QueueFullError
+from streaming import SessionManager, SessionLimitError, SAMPLE_FORMATS
+import metrics
 
-# Initialize Flask app
-app = Flask(__name__)
-CORS(app)
-
-# Configuration
+# Configuration (defaults; override with DEEPFAKE_<NAME> environment variables
+# or the config argument of create_app)
 UPLOAD_FOLDER = tempfile.gettempdir()
 ALLOWED_EXTENSIONS = {'wav', 'mp3'}
 REFERENCE_STATS_FILE = 'reference_stats.json'
+FEATURE_MODE = 'global'                      # 'framed' needs framed REFERENCE_STATS_FILE
+PREDICTION_CACHE_BYTES = 64 * 1024 * 1024    # In-memory LRU budget
+PREDICTION_CACHE_DIR = None                  # Set a directory to enable the disk tier
+PREDICTION_CACHE_DISK_BYTES = 1024 * 1024 * 1024  # Disk tier budget (LRU by mtime)
+UPLOAD_SPILL_BYTES = 32 * 1024 * 1024        # Larger uploads are spooled to disk
+BATCH_WORKERS = 2                            # Pool size per batch (see gunicorn.conf.py)
+BATCH_EXECUTOR = 'process'                   # 'process' or 'thread'
+BATCH_MAX_FILES = 1000                       # Files per batch request
+BATCH_MAX_BYTES = 1024 * 1024 * 1024         # Total uncompressed audio per batch
+JOB_WORKERS = 2                              # Threads running async jobs
+JOB_MAX_QUEUE = 64                           # Pending jobs before 429
+JOB_MAX_QUEUED_BYTES = 2 * 1024 * 1024 * 1024  # Upload bytes held by jobs before 429
+JOB_STORE = None                             # SQLite path (shared by all server processes); None = in memory
+JOB_MAX_STORED = 1000                        # Finished jobs kept for polling
+METRICS_ENABLED = True                       # Per-stage timings for /metrics (process-wide)
+PRECISION = 'double'                         # 'single' = float32/complex64 FFT and spectra
+STREAM_REFERENCE_STATS_FILE = 'reference_stats_framed.json'  # Framed stats for /stream
+STREAM_MAX_SESSIONS = 32                     # Concurrent streaming sessions per process
+STREAM_IDLE_SECONDS = 60                     # Idle sessions are dropped after this
+STREAM_WINDOW_SECONDS = 10.0                 # Default rolling analysis window
+STREAM_MAX_WINDOW_SECONDS = 30.0             # Upper bound on a session's window
+STREAM_EMIT_MS = 500                         # Default prediction interval (ms of audio)
+STREAM_MAX_CHUNK_BYTES = 1024 * 1024         # Largest PCM chunk per request
+
+DEFAULT_CONFIG = {
+    'UPLOAD_FOLDER': UPLOAD_FOLDER,
+    'REFERENCE_STATS_FILE': REFERENCE_STATS_FILE,
+    'FEATURE_MODE': FEATURE_MODE,
+    'PREDICTION_CACHE_BYTES': PREDICTION_CACHE_BYTES,
+    'PREDICTION_CACHE_DIR': PREDICTION_CACHE_DIR,
+    'PREDICTION_CACHE_DISK_BYTES': PREDICTION_CACHE_DISK_BYTES,
+    'UPLOAD_SPILL_BYTES': UPLOAD_SPILL_BYTES,
+    'BATCH_WORKERS': BATCH_WORKERS,
+    'BATCH_EXECUTOR': BATCH_EXECUTOR,
+    'BATCH_MAX_FILES': BATCH_MAX_FILES,
+    'BATCH_MAX_BYTES': BATCH_MAX_BYTES,
+    'JOB_WORKERS': JOB_WORKERS,
+    'JOB_MAX_QUEUE': JOB_MAX_QUEUE,
+    'JOB_MAX_QUEUED_BYTES': JOB_MAX_QUEUED_BYTES,
+    'JOB_STORE': JOB_STORE,
+    'JOB_MAX_STORED': JOB_MAX_STORED,
+    'METRICS_ENABLED': METRICS_ENABLED,
+    'PRECISION': PRECISION,
+    'STREAM_REFERENCE_STATS_FILE': STREAM_REFERENCE_STATS_FILE,
+    'STREAM_MAX_SESSIONS': STREAM_MAX_SESSIONS,
+    'STREAM_IDLE_SECONDS': STREAM_IDLE_SECONDS,
+    'STREAM_WINDOW_SECONDS': STREAM_WINDOW_SECONDS,
+    'STREAM_MAX_WINDOW_SECONDS': STREAM_MAX_WINDOW_SECONDS,
+    'STREAM_EMIT_MS': STREAM_EMIT_MS,
+    'STREAM_MAX_CHUNK_BYTES': STREAM_MAX_CHUNK_BYTES
+}
+
+api = Blueprint('api', __name__)
 
-# Global detector instance
-detector = None
 
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
-def initialize_detector():
-    global detector
+
+def progressive_options(params, feature_mode):
+    # predict_progressive keyword arguments from ?progressive=1&... request
+    # parameters, or None for a full-clip prediction
+    if params.get('progressive', '').lower() not in ('1', 'true', 'yes'):
+        return None
+    options = {}
+    for name in ('confidence_threshold', 'min_seconds', 'max_seconds', 'time_budget'):
+        if params.get(name) not in (None, ''):
+            value = float(params[name])
+            if value < 0:
+                raise ValueError(f'{name} must not be negative')
+            options[name] = value
+    if params.get('strategy'):
+        strategies = PROGRESSIVE_STRATEGIES[feature_mode]
+        if params['strategy'] not in strategies:
+            raise ValueError(f"strategy must be one of {list(strategies)}")
+        options['strategy'] = params['strategy']
+    return options
+
+
+def is_archive(filename):
+    name = filename.lower()
+    return name.endswith(('.zip', '.tar', '.tar.gz', '.tgz', '.tar.bz2', '.tar.xz'))
+
+
+def read_archive(upload, max_files, max_bytes, n_files=0, total=0):
+    # (name, bytes) for every audio member; read in memory, never extracted
+    # to disk, so member paths cannot escape anywhere. n_files/total are what
+    # the batch already holds; both limits are checked before a member is read.
+    members = []
+    
+    def add(name, size, read):
+        nonlocal total
+        if not allowed_file(name):
+            return
+        if n_files + len(members) >= max_files:
+            raise ValueError(f'Too many files (max {max_files})')
+        total += size
+        if total > max_bytes:
+            raise ValueError(f'Batch audio exceeds {max_bytes} bytes')
+        members.append((name, read()))
+    
+    try:
+        if upload.filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(upload.stream) as archive:
+                for info in archive.infolist():
+                    if not info.is_dir():
+                        add(info.filename, info.file_size, lambda: archive.read(info))
+        else:
+            with tarfile.open(fileobj=upload.stream, mode='r:*') as archive:
+                for info in archive:
+                    if info.isfile():
+                        add(info.name, info.size, lambda: archive.extractfile(info).read())
+    except (zipfile.BadZipFile, tarfile.TarError) as e:
+        raise ValueError(f'Invalid archive: {str(e)}')
+    return members
+
+
+def get_detector():
+    return current_app.extensions['deepfake']['detector']
+
+
+def get_prediction_cache():
+    return current_app.extensions['deepfake']['prediction_cache']
+
+
+def get_job_manager():
+    # Created on first use, once the detector is available
+    state = current_app.extensions['deepfake']
+    if state['job_manager'] is None and state['detector'] is not None:
+        config = current_app.config
+        if config['JOB_STORE']:
+            store = SQLiteJobStore(config['JOB_STORE'], max_jobs=config['JOB_MAX_STORED'])
+        else:
+            store = MemoryJobStore(max_jobs=config['JOB_MAX_STORED'])
+        state['job_manager'] = JobManager(state['detector'], workers=config['JOB_WORKERS'],
+                                          max_queue=config['JOB_MAX_QUEUE'], store=store,
+                                          batch_workers=config['BATCH_WORKERS'],
+                                          batch_executor=config['BATCH_EXECUTOR'],
+                                          max_queued_bytes=config['JOB_MAX_QUEUED_BYTES'])
+    return state['job_manager']
+
+
+def get_session_manager():
+    # Created on first use, once the framed stream detector is available
+    state = current_app.extensions['deepfake']
+    if state['session_manager'] is None and state['stream_detector'] is not None:
+        config = current_app.config
+        state['session_manager'] = SessionManager(
+            state['stream_detector'], max_sessions=config['STREAM_MAX_SESSIONS'],
+            idle_seconds=config['STREAM_IDLE_SECONDS'])
+    return state['session_manager']
+
+
+def collect_batch_items(config):
+    # (name, bytes) for multipart 'files' and zip/tar 'archive' uploads.
+    # BATCH_MAX_FILES and BATCH_MAX_BYTES bound the whole request: one
+    # running count and byte total across all uploads, checked before each
+    # read so nothing past the limits is loaded.
+    max_files, max_bytes = config['BATCH_MAX_FILES'], config['BATCH_MAX_BYTES']
+    items = []
+    total = 0
+    for upload in request.files.getlist('files'):
+        if not upload.filename:
+            continue
+        if len(items) >= max_files:
+            raise ValueError(f'Too many files (max {max_files})')
+        # One byte past the budget is enough to detect an overflow
+        data = upload.read(max_bytes - total + 1)
+        total += len(data)
+        if total > max_bytes:
+            raise ValueError(f'Batch audio exceeds {max_bytes} bytes')
+        items.append((upload.filename, data))
+    for upload in request.files.getlist('archive'):
+        if not is_archive(upload.filename):
+            raise ValueError(f'Unsupported archive format: {upload.filename}')
+        members = read_archive(upload, max_files, max_bytes, len(items), total)
+        total += sum(len(data) for _, data in members)
+        items += members
+    if not items:
+        raise ValueError('No files in the request')
+    return items
+
+
+def initialize_detector(target_app=None):
+    target_app = target_app or app
+    stats_file = target_app.config['REFERENCE_STATS_FILE']
+    feature_mode = target_app.config['FEATURE_MODE']
     
     # Check if reference stats exist
-    if not os.path.exists(REFERENCE_STATS_FILE):
+    if not os.path.exists(stats_file):
         print("\nReference statistics not found.")
         print("Computing reference statistics from dataset...")
         print("This may take a few minutes...\n")
@@ -41,24 +224,74 @@ def initialize_detector():
             compute_and_save_reference_stats(
                 human_dir='../../data/human',
                 nonhuman_dir='../../data/nonhuman',
-                output_file=REFERENCE_STATS_FILE
+                output_file=stats_file,
+                feature_mode=feature_mode
             )
-            print(f"\n[SUCCESS] Reference statistics saved to {REFERENCE_STATS_FILE}")
+            print(f"\n[SUCCESS] Reference statistics saved to {stats_file}")
         except Exception as e:
             print(f"\n[ERROR] Failed to compute reference statistics: {str(e)}")
             return False
     
     try:
-        detector = DeepfakeDetector(REFERENCE_STATS_FILE)
-        print(f"[SUCCESS] Detector initialized with {REFERENCE_STATS_FILE}")
-        return True
+        processor = AudioSignalProcessor(precision=target_app.config['PRECISION'])
+        detector = DeepfakeDetector(stats_file, feature_mode=feature_mode, processor=processor)
+        target_app.extensions['deepfake']['detector'] = detector
+        print(f"[SUCCESS] Detector initialized with {stats_file}")
     except Exception as e:
         print(f"[ERROR] Failed to initialize detector: {str(e)}")
         return False
+    
+    # Streaming sessions need framed features; without framed statistics
+    # /stream is unavailable but the rest of the API still works
+    stream_stats_file = target_app.config['STREAM_REFERENCE_STATS_FILE']
+    if feature_mode == 'framed':
+        target_app.extensions['deepfake']['stream_detector'] = detector
+    elif os.path.exists(stream_stats_file):
+        try:
+            target_app.extensions['deepfake']['stream_detector'] = DeepfakeDetector(
+                stream_stats_file, feature_mode='framed', processor=processor)
+            print(f"[SUCCESS] Streaming detector initialized with {stream_stats_file}")
+        except Exception as e:
+            print(f"[ERROR] Failed to initialize streaming detector: {str(e)}")
+    else:
+        print(f"[WARNING] {stream_stats_file} not found; /stream is disabled")
+    return True
 
 
-@app.route('/status', methods=['GET'])
+def create_app(config=None, load_detector=True):
+    # Application factory. With load_detector=True the detector is built
+    # here, so a preloading server (gunicorn --preload) creates it once in
+    # the master and forked workers share it copy-on-write.
+    new_app = Flask(__name__)
+    CORS(new_app)
+    new_app.config.update(DEFAULT_CONFIG)
+    new_app.config.from_prefixed_env('DEEPFAKE')
+    new_app.config.update(config or {})
+    
+    new_app.extensions['deepfake'] = {
+        'detector': None,
+        'stream_detector': None,
+        'job_manager': None,
+        'session_manager': None,
+        # Results for previously seen uploads (content hash + detector version)
+        'prediction_cache': PredictionCache(new_app.config['PREDICTION_CACHE_BYTES'],
+                                            new_app.config['PREDICTION_CACHE_DIR'],
+                                            new_app.config['PREDICTION_CACHE_DISK_BYTES'])
+    }
+    new_app.register_blueprint(api)
+    if new_app.config['METRICS_ENABLED']:
+        metrics.REGISTRY.enable()
+    else:
+        metrics.REGISTRY.disable()
+    
+    if load_detector and not initialize_detector(new_app):
+        raise RuntimeError("Failed to initialize detector")
+    return new_app
+
+
+@api.route('/status', methods=['GET'])
 def status():
+    detector = get_detector()
     if detector is None:
         return jsonify({
             'status': 'not_ready',
@@ -69,15 +302,22 @@ def status():
     return jsonify({
         'status': 'ready',
         'reference_statistics': {
-            'human_phase_coherence_mean': stats['human']['mean'],
-            'ai_phase_coherence_mean': stats['ai']['mean']
+            'human_phase_coherence_mean': stats['human']['phase_coherence']['mean'],
+            'ai_phase_coherence_mean': stats['ai']['phase_coherence']['mean']
         }
     })
 
 
-@app.route('/predict', methods=['POST'])
+@api.route('/predict', methods=['POST'])
 def predict():
+    with metrics.in_flight('http_predict'), metrics.stage('http_predict'):
+        return _predict()
+
+
+def _predict():
     # Check if detector is initialized
+    detector = get_detector()
+    prediction_cache = get_prediction_cache()
     if detector is None:
         return jsonify({
             'success': False,
@@ -108,22 +348,61 @@ def predict():
         }), 400
     
     try:
-        # Save uploaded file to temporary location
-        filename = file.filename
-        temp_path = os.path.join(UPLOAD_FOLDER, filename)
-        file.save(temp_path)
+        progressive = progressive_options(request.values, detector.feature_mode)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    temp_path = None
+    try:
+        # Uploads are decoded in memory; only large ones go through a
+        # uniquely named temporary file (memory-mapped when WAV)
+        spill_bytes = current_app.config['UPLOAD_SPILL_BYTES']
+        with metrics.stage('upload'):
+            if request.content_length and request.content_length > spill_bytes:
+                extension = file.filename.rsplit('.', 1)[1].lower()
+                fd, temp_path = tempfile.mkstemp(suffix=f'.{extension}',
+                                                 dir=current_app.config['UPLOAD_FOLDER'])
+                os.close(fd)
+                file.save(temp_path)
+                source = temp_path
+                upload_bytes = os.path.getsize(temp_path)
+            else:
+                source = file.read()
+                upload_bytes = len(source)
+        metrics.inc('deepfake_upload_bytes_total', upload_bytes)
+        with metrics.stage('hash'):
+            if temp_path is not None:
+                cache_key = file_content_key(temp_path, detector.version)
+            else:
+                cache_key = content_key(source, detector.version)
+        if progressive is not None:
+            # Progressive results depend on the options; time budgets make
+            # them depend on machine load too, so those are never cached
+            cache_key += '-progressive-' + json.dumps(progressive, sort_keys=True)
+            if 'time_budget' in progressive:
+                cache_key = None
         
-        # Run prediction
-        result = detector.predict(temp_path, verbose=False)
-
-        # Clean up
-        os.remove(temp_path)
+        # Repeat uploads are answered from the cache, skipping decode and FFT
+        result = prediction_cache.get(cache_key) if cache_key is not None else None
+        cached = result is not None
+        if not cached:
+            # Run prediction
+            if progressive is not None:
+                result = detector.predict_progressive(source, **progressive)
+            else:
+                result = detector.predict(source, verbose=False)
+            if cache_key is not None:
+                prediction_cache.put(cache_key, result)
         
         # Format response
-        return jsonify({
+        response = {
             'success': True,
             'prediction': result['prediction'],
             'confidence': result['confidence'],
+            'cached': cached,
             'details': {
                 'phase_coherence': result['phase_coherence'],
                 'distance_to_human': result['distance_to_human'],
@@ -132,17 +411,307 @@ def predict():
                 'spectral_entropy': result['spectral_entropy'],
                 'spectral_l2_norm': result['spectral_l2_norm']
             }
-        }), 200
+        }
+        if progressive is not None:
+            response['progressive'] = {
+                'analyzed_seconds': result['analyzed_seconds'],
+                'total_seconds': result['total_seconds'],
+                'steps': result['steps'],
+                'stop_reason': result['stop_reason'],
+                'early_exit': result['early_exit']
+            }
+        return jsonify(response), 200
     
     except Exception as e:
         return jsonify({
             'success': False,
             'error': f'Prediction error: {str(e)}'
         }), 500
+    
+    finally:
+        # Clean up
+        if temp_path is not None and os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+@api.route('/predict_batch', methods=['POST'])
+def predict_batch():
+    # Many files per request (multipart 'files' and/or a zip/tar 'archive'),
+    # scored in parallel and streamed back as NDJSON in completion order
+    detector = get_detector()
+    prediction_cache = get_prediction_cache()
+    if detector is None:
+        return jsonify({
+            'success': False,
+            'error': 'Detector not initialized. Please try again.'
+        }), 503
+    
+    config = current_app.config
+    try:
+        items = collect_batch_items(config)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    def line(index, result, cached=False):
+        result = dict(result, index=index, filepath=items[index][0], cached=cached)
+        return json.dumps(result) + '\n'
+    
+    def generate():
+        keys = [content_key(data, detector.version) for _, data in items]
+        pending = []
+        for index, (name, data) in enumerate(items):
+            if not allowed_file(name):
+                yield line(index, {
+                    'error': 'Invalid file format. Please upload a WAV or MP3 file.',
+                    'prediction': None,
+                    'confidence': None
+                })
+                continue
+            result = prediction_cache.get(keys[index])
+            if result is not None:
+                yield line(index, result, cached=True)
+            else:
+                pending.append(index)
+        
+        # Spawned, not forked: requests run on threads (gunicorn gthread)
+        results = detector.iter_predict_batch(
+            [items[index][1] for index in pending], workers=config['BATCH_WORKERS'],
+            executor=config['BATCH_EXECUTOR'], ordered=False, start_method='spawn')
+        for position, result in results:
+            index = pending[position]
+            if result.get('error') is None:
+                prediction_cache.put(keys[index], {k: v for k, v in result.items()
+                                                   if k != 'filepath'})
+            yield line(index, result)
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+
+@api.route('/jobs', methods=['POST'])
+def submit_job():
+    # Single 'file' -> predict job; 'files'/'archive' -> batch job
+    job_manager = get_job_manager()
+    if job_manager is None:
+        return jsonify({
+            'success': False,
+            'error': 'Detector not initialized. Please try again.'
+        }), 503
+    
+    try:
+        file = request.files.get('file')
+        if file is not None and file.filename:
+            if not allowed_file(file.filename):
+                raise ValueError('Invalid file format. Please upload a WAV or MP3 file.')
+            kind, items = 'predict', [(file.filename, file.read())]
+        else:
+            kind, items = 'batch', collect_batch_items(current_app.config)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    try:
+        job_id = job_manager.submit(kind, items)
+    except QueueFullError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '5'}
+    
+    return jsonify({
+        'success': True,
+        'job_id': job_id,
+        'status_url': f'/jobs/{job_id}',
+        'result_url': f'/jobs/{job_id}/result'
+    }), 202
+
+
+@api.route('/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id) if job_manager is not None else None
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    job.pop('result')
+    job['progress'] = job['completed'] / job['total'] if job['total'] else 0.0
+    return jsonify(job)
+
+
+@api.route('/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    job_manager = get_job_manager()
+    job = job_manager.get(job_id) if job_manager is not None else None
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Job not found'
+        }), 404
+    
+    if job['status'] == 'failed':
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'error': job['error']
+        }), 500
+    if job['status'] != 'done':
+        # Not ready yet: poll again
+        return jsonify({
+            'success': False,
+            'status': job['status'],
+            'completed': job['completed'],
+            'total': job['total']
+        }), 202
+    
+    return jsonify({
+        'success': True,
+        'status': job['status'],
+        'result': job['result']
+    })
 
 
-@app.route('/stats', methods=['GET'])
+@api.route('/stream', methods=['POST'])
+def create_stream():
+    # Opens a streaming session; PCM chunks are then POSTed to /stream/<id>
+    session_manager = get_session_manager()
+    if session_manager is None:
+        return jsonify({
+            'success': False,
+            'error': 'Streaming needs framed reference statistics. Run: python '
+                     'reference_stats.py --feature-mode framed --output '
+                     f"{current_app.config['STREAM_REFERENCE_STATS_FILE']}"
+        }), 503
+    
+    config = current_app.config
+    params = request.get_json(silent=True) or request.values
+    try:
+        sample_rate = int(params.get('sample_rate', 0))
+        if sample_rate <= 0:
+            raise ValueError('sample_rate is required and must be positive')
+        channels = int(params.get('channels', 1))
+        if channels < 1:
+            raise ValueError('channels must be at least 1')
+        sample_format = params.get('format', 'int16')
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"format must be one of {list(SAMPLE_FORMATS)}")
+        window_seconds = float(params.get('window_seconds', config['STREAM_WINDOW_SECONDS']))
+        if not 0 < window_seconds <= config['STREAM_MAX_WINDOW_SECONDS']:
+            raise ValueError(f"window_seconds must be in (0, {config['STREAM_MAX_WINDOW_SECONDS']}]")
+        session_id, session = session_manager.create(
+            sample_rate,
+            channels=channels,
+            sample_format=sample_format,
+            window_seconds=window_seconds,
+            emit_interval_ms=float(params.get('emit_interval_ms', config['STREAM_EMIT_MS'])))
+    except SessionLimitError as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 429, {'Retry-After': '5'}
+    except (TypeError, ValueError) as e:
+        return jsonify({
+            'success': False,
+            'error': str(e)
+        }), 400
+    
+    return jsonify({
+        'success': True,
+        'session_id': session_id,
+        'chunk_url': f'/stream/{session_id}',
+        'sample_rate': session.sample_rate,
+        'window_seconds': session.window_samples / session.sample_rate,
+        'emit_interval_ms': session.emit_samples * 1000 / session.sample_rate
+    }), 201
+
+
+@api.route('/stream/<session_id>', methods=['POST'])
+def stream_chunk(session_id):
+    # Raw interleaved PCM in the request body; returns the predictions
+    # emitted while consuming it
+    session_manager = get_session_manager()
+    session = session_manager.get(session_id) if session_manager is not None else None
+    if session is None:
+        return jsonify({
+            'success': False,
+            'error': 'Streaming session not found'
+        }), 404
+    
+    max_bytes = current_app.config['STREAM_MAX_CHUNK_BYTES']
+    if request.content_length and request.content_length > max_bytes:
+        return jsonify({
+            'success': False,
+            'error': f'Chunk exceeds {max_bytes} bytes'
+        }), 413
+    
+    events = []
+    with session.lock, metrics.stage('stream_chunk'):
+        # Chunked transfer bodies have no length; read in bounded blocks
+        received = 0
+        for block in iter(lambda: request.stream.read(64 * 1024), b''):
+            received += len(block)
+            if received > max_bytes:
+                return jsonify({
+                    'success': False,
+                    'error': f'Chunk exceeds {max_bytes} bytes',
+                    'events': events
+                }), 413
+            events += session.feed(block)
+    
+    return jsonify({
+        'success': True,
+        'time': session.samples_received / session.sample_rate,
+        'events': events,
+        'latest': session.latest
+    })
+
+
+@api.route('/stream/<session_id>', methods=['GET'])
+def stream_status(session_id):
+    session_manager = get_session_manager()
+    session = session_manager.get(session_id) if session_manager is not None else None
+    if session is None:
+        return jsonify({
+            'success': False,
+            'error': 'Streaming session not found'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'time': session.samples_received / session.sample_rate,
+        'latest': session.latest
+    })
+
+
+@api.route('/stream/<session_id>', methods=['DELETE'])
+def close_stream(session_id):
+    # Ends the session with a final prediction over the current window
+    session_manager = get_session_manager()
+    session = session_manager.close(session_id) if session_manager is not None else None
+    if session is None:
+        return jsonify({
+            'success': False,
+            'error': 'Streaming session not found'
+        }), 404
+    
+    with session.lock:
+        final = session.finish()
+    return jsonify({
+        'success': True,
+        'time': session.samples_received / session.sample_rate,
+        'final': final
+    })
+
+
+@api.route('/stats', methods=['GET'])
 def get_stats():
+    detector = get_detector()
     if detector is None:
         return jsonify({
             'error': 'Detector not initialized'
@@ -152,20 +721,67 @@ def get_stats():
     return jsonify(stats)
 
 
-@app.errorhandler(404)
+@api.route('/cache', methods=['GET'])
+def cache_stats():
+    return jsonify(get_prediction_cache().stats())
+
+
+@api.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    # Prometheus text format: stage latency histograms, in-flight counts,
+    # counters and cache/queue gauges (per server process)
+    cache = get_prediction_cache().stats()
+    job_manager = current_app.extensions['deepfake']['job_manager']
+    session_manager = current_app.extensions['deepfake']['session_manager']
+    gauges = [
+        ('deepfake_prediction_cache_entries', 'Entries in the in-memory prediction cache',
+         cache['entries']),
+        ('deepfake_prediction_cache_bytes', 'Size of the in-memory prediction cache',
+         cache['bytes']),
+        ('deepfake_job_queue_depth', 'Async jobs waiting for a worker',
+         job_manager.queue_depth() if job_manager is not None else 0),
+        ('deepfake_job_queued_bytes', 'Upload bytes held by queued and running async jobs',
+         job_manager.queued_bytes() if job_manager is not None else 0),
+        ('deepfake_stream_sessions', 'Open streaming sessions',
+         len(session_manager) if session_manager is not None else 0),
+        ('deepfake_metrics_enabled', 'Whether stage instrumentation is recording',
+         int(metrics.REGISTRY.enabled))
+    ]
+    # Monotonic since process start, so rate() applies
+    counters = [
+        ('deepfake_prediction_cache_memory_hits_total', 'Prediction cache hits (memory tier)',
+         cache['memory_hits']),
+        ('deepfake_prediction_cache_disk_hits_total', 'Prediction cache hits (disk tier)',
+         cache['disk_hits']),
+        ('deepfake_prediction_cache_misses_total', 'Prediction cache misses', cache['misses']),
+        ('deepfake_prediction_cache_evictions_total', 'Prediction cache evictions',
+         cache['evictions']),
+        ('deepfake_prediction_cache_disk_evictions_total',
+         'Files deleted from the prediction cache disk tier', cache['disk_evictions'])
+    ]
+    return Response(metrics.REGISTRY.render(gauges, counters),
+                    content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+@api.app_errorhandler(404)
 def not_found(error):
     return jsonify({
         'error': 'Not found'
     }), 404
 
 
-@app.errorhandler(500)
+@api.app_errorhandler(500)
 def internal_error(error):
     return jsonify({
         'error': 'Internal server error'
     }), 500
 
 
+# Module-level app for `python app.py` and quickstart.py (detector is
+# loaded by initialize_detector); production servers use wsgi.py
+app = create_app(load_detector=False)
+
+
 if __name__ == '__main__':
     print("\n" + "=" * 70)
     print("DEEPFAKE DETECTION API - Initialization")
@@ -181,8 +797,13 @@ if __name__ == '__main__':
         print("=" * 70)
         print("\nEndpoints:")
         print("  POST /predict             - Deepfake detection")
+        print("  POST /predict_batch       - Batch detection (NDJSON stream)")
+        print("  POST /jobs                - Submit async job (poll /jobs/<id>)")
+        print("  POST /stream              - Open a live streaming session (PCM chunks)")
         print("  GET  /status              - Check API status")
         print("  GET  /stats               - Reference statistics")
+        print("  GET  /cache               - Prediction cache statistics")
+        print("  GET  /metrics             - Prometheus metrics")
         print("\nBackend: http://localhost:5000")
         print("Frontend: http://localhost:5173")
         print("=" * 70 + "\n")
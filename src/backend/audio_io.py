@@ -0,0 +1,306 @@
+"""
+Audio I/O Module
+Streaming, memory-mapped WAV reading with single-pass downmix and normalization.
+Sources can be file paths, bytes-like buffers or file-like objects; in-memory
+PCM WAV data is viewed in place without copying. MP3 is decoded with the
+lightest available decoder, optionally resampled to a target rate.
+"""
+
+import io
+import os
+import struct
+import tempfile
+import importlib
+import numpy as np
+from math import gcd
+from pathlib import Path
+from scipy.io import wavfile
+
+# Codec backends and scipy.signal are imported on first use, so WAV-only
+# workloads (CLI, API workers) never pay for them at startup
+_modules = {}
+
+
+def _lazy_import(name):
+    # Module or None if it is not installed (cached either way)
+    if name not in _modules:
+        try:
+            _modules[name] = importlib.import_module(name)
+        except (ImportError, OSError):
+            # soundfile raises OSError when libsndfile is missing
+            _modules[name] = None
+    return _modules[name]
+
+
+MP3_DECODERS = ('soundfile', 'librosa')
+
+DEFAULT_CHUNK_SIZE = 65536
+
+# Integer PCM is normalized to [-1, 1] by its peak (float WAVs are kept as is)
+NORMALIZED_DTYPES = (np.int16, np.int32)
+
+# Full-scale value of integer PCM, used when the peak is unknown (segments)
+_FULL_SCALE = {
+    np.dtype('<i2'): 1.0 / 32768,
+    np.dtype('<i4'): 1.0 / 2147483648
+}
+
+# (format tag, bits per sample) -> sample dtype for in-place WAV parsing
+_WAV_DTYPES = {
+    (1, 8): np.dtype('u1'),
+    (1, 16): np.dtype('<i2'),
+    (1, 32): np.dtype('<i4'),
+    (3, 32): np.dtype('<f4'),
+    (3, 64): np.dtype('<f8')
+}
+_WAVE_FORMAT_EXTENSIBLE = 0xFFFE
+
+
+def is_path(source):
+    return isinstance(source, (str, Path))
+
+
+def _as_buffer(source):
+    # Bytes-like view of an in-memory source (no copy for bytes/BytesIO)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return memoryview(source)
+    if isinstance(source, io.BytesIO):
+        return source.getbuffer()
+    return None
+
+
+def sniff_format(source):
+    # 'wav', 'mp3' or None from the file extension or the leading bytes
+    if is_path(source):
+        ext = Path(source).suffix.lower().lstrip('.')
+        return ext or None
+    buffer = _as_buffer(source)
+    if buffer is not None:
+        header = bytes(buffer[:12])
+    else:
+        position = source.tell()
+        header = source.read(12)
+        source.seek(position)
+    if header[:4] in (b'RIFF', b'RF64') and header[8:12] == b'WAVE':
+        return 'wav'
+    if header[:3] == b'ID3' or (len(header) > 1 and header[0] == 0xFF
+                                 and header[1] & 0xE0 == 0xE0):
+        return 'mp3'
+    return None
+
+
+def parse_wav_buffer(buffer):
+    # (sr, samples) where samples is a read-only view into buffer, or None
+    # when the layout needs scipy (RIFX, 24-bit, compressed formats)
+    if bytes(buffer[:4]) != b'RIFF' or bytes(buffer[8:12]) != b'WAVE':
+        return None
+    pos = 12
+    fmt = None
+    while pos + 8 <= len(buffer):
+        chunk_id = bytes(buffer[pos:pos + 4])
+        chunk_size = struct.unpack('<I', buffer[pos + 4:pos + 8])[0]
+        body = pos + 8
+        if chunk_id == b'fmt ':
+            tag, channels, sr = struct.unpack('<HHI', buffer[body:body + 8])
+            bits = struct.unpack('<H', buffer[body + 14:body + 16])[0]
+            if tag == _WAVE_FORMAT_EXTENSIBLE and chunk_size >= 26:
+                tag = struct.unpack('<H', buffer[body + 24:body + 26])[0]
+            fmt = (tag, channels, sr, bits)
+        elif chunk_id == b'data':
+            if fmt is None or (fmt[0], fmt[3]) not in _WAV_DTYPES:
+                return None
+            tag, channels, sr, bits = fmt
+            dtype = _WAV_DTYPES[(tag, bits)]
+            # Truncated uploads keep every complete frame
+            n_frames = min(chunk_size, len(buffer) - body) // (dtype.itemsize * channels)
+            data = np.frombuffer(buffer, dtype=dtype, count=n_frames * channels, offset=body)
+            if channels > 1:
+                data = data.reshape(-1, channels)
+            return sr, data
+        # Chunks are word aligned
+        pos = body + chunk_size + (chunk_size & 1)
+    return None
+
+
+def open_wav(source, mmap=True):
+    buffer = _as_buffer(source)
+    if buffer is None and not is_path(source):
+        # Other file-like objects (e.g. upload streams) are read once
+        buffer = memoryview(source.read())
+    if buffer is not None:
+        parsed = parse_wav_buffer(buffer)
+        if parsed is not None:
+            return parsed
+        return wavfile.read(io.BytesIO(buffer))
+    try:
+        return wavfile.read(source, mmap=mmap)
+    except ValueError:
+        # Formats scipy cannot memory-map (e.g. 24-bit PCM) are read eagerly
+        if not mmap:
+            raise
+        return wavfile.read(source, mmap=False)
+
+
+def _downmix_into(block, out):
+    # Mono float32 view of a (frames,) or (frames, channels) block, written into out
+    if block.ndim > 1:
+        np.sum(block, axis=1, dtype=np.float32, out=out)
+        out /= block.shape[1]
+    else:
+        np.copyto(out, block, casting='unsafe')
+    return out
+
+
+def _peak(data, chunk_size):
+    # Peak absolute value of the downmixed signal, one chunk at a time
+    peak = 0.0
+    scratch = np.empty(min(chunk_size, len(data)), dtype=np.float32)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        if block.ndim == 1:
+            # min/max reduce without allocating (and without int16 abs overflow)
+            peak = max(peak, abs(float(block.max())), abs(float(block.min())))
+        else:
+            mixed = _downmix_into(block, scratch[:len(block)])
+            peak = max(peak, float(np.max(np.abs(mixed))))
+    return peak
+
+
+def _scale_for(data, chunk_size, normalize):
+    if normalize and data.dtype in NORMALIZED_DTYPES and len(data):
+        peak = _peak(data, chunk_size)
+        if peak > 0:
+            return 1.0 / peak
+    return None
+
+
+def _write_chunk(block, out, scale):
+    _downmix_into(block, out)
+    if scale is not None:
+        out *= scale
+    return out
+
+
+def iter_wav_chunks(source, chunk_size=DEFAULT_CHUNK_SIZE, mmap=True, normalize=True):
+    # Returns (sr, generator of mono float32 chunks of chunk_size samples;
+    # the last chunk may be shorter)
+    sr, data = open_wav(source, mmap=mmap)
+    scale = _scale_for(data, chunk_size, normalize)
+
+    def chunks():
+        for start in range(0, len(data), chunk_size):
+            block = data[start:start + chunk_size]
+            yield _write_chunk(block, np.empty(len(block), dtype=np.float32), scale)
+
+    return sr, chunks()
+
+
+def read_wav(source, chunk_size=DEFAULT_CHUNK_SIZE, mmap=True, normalize=True):
+    # Whole signal as one float32 array, filled chunk by chunk from the
+    # memory-mapped file or in-memory buffer (no intermediate full-size copies)
+    sr, data = open_wav(source, mmap=mmap)
+    scale = _scale_for(data, chunk_size, normalize)
+    signal = np.empty(len(data), dtype=np.float32)
+    for start in range(0, len(data), chunk_size):
+        block = data[start:start + chunk_size]
+        _write_chunk(block, signal[start:start + len(block)], scale)
+    return signal, sr
+
+
+def open_segments(source, target_sr=None, mp3_decoders=MP3_DECODERS):
+    # (sr, n_samples, read(start, stop)) for random access to mono float32
+    # segments. PCM WAV is memory-mapped (or viewed in place) and only the
+    # requested range is converted; integer PCM is scaled by its full-scale
+    # value, since finding the peak would read the whole file. Other formats
+    # and resampled input are decoded once up front.
+    if target_sr is None and sniff_format(source) == 'wav':
+        sr, data = open_wav(source, mmap=True)
+        scale = _FULL_SCALE.get(data.dtype)
+
+        def read(start, stop):
+            block = data[start:stop]
+            return _write_chunk(block, np.empty(len(block), dtype=np.float32), scale)
+
+        return sr, len(data), read
+    signal, sr = load_audio(source, target_sr, mp3_decoders)
+    return sr, len(signal), lambda start, stop: signal[start:stop]
+
+
+def resample(signal, sr, target_sr):
+    # Polyphase resampling (anti-aliased) to target_sr; no-op when equal
+    if target_sr is None or sr == target_sr:
+        return signal, sr
+    g = gcd(int(sr), int(target_sr))
+    signal = _lazy_import('scipy.signal').resample_poly(signal, target_sr // g, sr // g)
+    return signal.astype(np.float32, copy=False), target_sr
+
+
+def _decode_mp3_soundfile(source):
+    # libsndfile >= 1.1 decodes MP3 natively
+    soundfile = _lazy_import('soundfile')
+    if is_path(source):
+        data, sr = soundfile.read(str(source), dtype='float32')
+    else:
+        buffer = _as_buffer(source)
+        data, sr = soundfile.read(io.BytesIO(buffer) if buffer is not None else source,
+                                  dtype='float32')
+    if data.ndim > 1:
+        # Same downmix as librosa mono=True
+        data = data.mean(axis=1, dtype=np.float32)
+    return data, sr
+
+
+def _decode_mp3_librosa(source):
+    # Fallback decoder (audioread/ffmpeg); heavy import
+    librosa = _lazy_import('librosa')
+    if is_path(source):
+        return librosa.load(str(source), sr=None, mono=True)
+    buffer = _as_buffer(source)
+    data = bytes(buffer) if buffer is not None else source.read()
+    # audioread needs a real file
+    fd, temp_path = tempfile.mkstemp(suffix='.mp3')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        return librosa.load(temp_path, sr=None, mono=True)
+    finally:
+        os.remove(temp_path)
+
+
+_MP3_DECODER_FUNCS = {
+    'soundfile': _decode_mp3_soundfile,
+    'librosa': _decode_mp3_librosa
+}
+
+
+def available_decoders():
+    return [name for name in MP3_DECODERS if _lazy_import(name) is not None]
+
+
+def decode_mp3(source, decoders=MP3_DECODERS):
+    errors = []
+    for name in decoders:
+        if _lazy_import(name) is None:
+            continue
+        try:
+            return _MP3_DECODER_FUNCS[name](source)
+        except Exception as e:
+            errors.append(f"{name}: {str(e)}")
+            if not is_path(source) and hasattr(source, 'seek'):
+                source.seek(0)
+    if not errors:
+        raise ValueError("No MP3 decoder installed (install soundfile or librosa)")
+    raise ValueError("MP3 decoding failed (" + "; ".join(errors) + ")")
+
+
+def load_audio(source, target_sr=None, mp3_decoders=MP3_DECODERS):
+    # Mono float32 signal and its rate, resampled to target_sr if given
+    file_format = sniff_format(source)
+    if file_format == 'mp3':
+        signal, sr = decode_mp3(source, mp3_decoders)
+    elif file_format == 'wav':
+        signal, sr = read_wav(source, mmap=True)
+    else:
+        file_ext = Path(source).suffix.lower() if is_path(source) else 'unrecognized data'
+        raise ValueError(f"Unsupported file format: {file_ext}. Use WAV or MP3.")
+    return resample(signal, sr, target_sr)
@@ -0,0 +1,550 @@
+#!/usr/bin/env python3
+"""
+Benchmark script for the deepfake detection backend.
+
+    python benchmark.py startup [--audio FILE] [--output startup.json]
+    python benchmark.py memory [--minutes 1] [--precision single] [--output memory.json]
+    python benchmark.py suite [--quick] [--output bench.json] [--baseline old.json]
+    python benchmark.py compare old.json new.json [--max-regression 0.25]
+    python benchmark.py precision [AUDIO_OR_DIR ...] [--max-sigma-drift 0.01]
+
+startup: import time of the backend modules and first-prediction latency,
+each measured in a fresh interpreter, plus the heavy modules a WAV-only
+prediction pulled in.
+memory: peak RSS (and traced NumPy allocations) per minute of audio for
+full, lean and framed feature extraction, each in a fresh interpreter.
+suite: median time and traced peak memory of every hot-path stage
+(load_wav through DeepfakeDetector.predict and the /predict route) on
+synthetic audio over a grid of durations, sample rates, channel counts and
+formats, plus predict_batch throughput. compare (or suite --baseline) fails
+when a stage got slower or bigger than the allowed regression.
+precision: feature drift of the single-precision (float32/complex64)
+pipeline against double precision, in reference_stats.json standard
+deviations, plus prediction agreement and the speedup.
+"""
+
+import io
+import os
+import sys
+import json
+import time
+import argparse
+import tempfile
+import subprocess
+import platform
+import statistics
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+
+BACKEND_DIR = Path(__file__).resolve().parent
+
+# Modules that should only be imported when their format/feature is used
+HEAVY_MODULES = ['librosa', 'numba', 'soundfile', 'scipy.signal', 'pydub']
+
+
+def write_synthetic_wav(path, duration=5.0, sr=16000, channels=1, seed=0):
+    from scipy.io import wavfile
+    rng = np.random.default_rng(seed)
+    t = np.arange(int(duration * sr)) / sr
+    # Harmonic tone + noise, enough structure for non-degenerate features
+    tone = sum(np.sin(2 * np.pi * f0 * t) / k for k, f0 in enumerate((140, 280, 420), 1))
+    signal = 0.3 * tone + 0.05 * rng.standard_normal(len(t))
+    if channels > 1:
+        signal = np.stack([signal] * channels, axis=1)
+    wavfile.write(path, sr, (signal * 32767 / np.max(np.abs(signal))).astype(np.int16))
+    return path
+
+
+def write_synthetic_audio(path, duration=5.0, sr=16000, channels=1, fmt='wav', seed=0):
+    # WAV via scipy; MP3 via soundfile (libsndfile >= 1.1). Returns None
+    # when the format cannot be written here.
+    if fmt == 'wav':
+        return write_synthetic_wav(path, duration, sr, channels, seed)
+    try:
+        import soundfile
+        if 'MP3' not in soundfile.available_formats():
+            return None
+    except (ImportError, OSError):
+        return None
+    wav_path = write_synthetic_wav(path + '.tmp.wav', duration, sr, channels, seed)
+    data, _ = soundfile.read(wav_path, dtype='float32')
+    os.remove(wav_path)
+    soundfile.write(path, data, sr, format='MP3')
+    return path
+
+
+def _run_python(code):
+    # Fresh interpreter in the backend directory; the snippet prints JSON
+    output = subprocess.run([sys.executable, '-c', code], cwd=BACKEND_DIR,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def measure_import(module, repeats=5):
+    code = (
+        "import time, json\n"
+        "t = time.perf_counter()\n"
+        f"import {module}\n"
+        "print(json.dumps({'ms': (time.perf_counter() - t) * 1e3}))\n"
+    )
+    timings = [_run_python(code)['ms'] for _ in range(repeats)]
+    return {'median_ms': statistics.median(timings), 'min_ms': min(timings)}
+
+
+def measure_first_prediction(audio_file):
+    code = (
+        "import time, json, sys\n"
+        "t0 = time.perf_counter()\n"
+        "from detector import DeepfakeDetector\n"
+        "t1 = time.perf_counter()\n"
+        "detector = DeepfakeDetector()\n"
+        "t2 = time.perf_counter()\n"
+        f"detector.predict({str(audio_file)!r})\n"
+        "t3 = time.perf_counter()\n"
+        f"detector.predict({str(audio_file)!r})\n"
+        "t4 = time.perf_counter()\n"
+        f"heavy = [m for m in {HEAVY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'import_ms': (t1 - t0) * 1e3, 'init_ms': (t2 - t1) * 1e3,\n"
+        "                  'first_predict_ms': (t3 - t2) * 1e3,\n"
+        "                  'second_predict_ms': (t4 - t3) * 1e3,\n"
+        "                  'total_to_first_result_ms': (t3 - t0) * 1e3,\n"
+        "                  'heavy_modules_loaded': heavy}))\n"
+    )
+    return _run_python(code)
+
+
+# Extraction calls compared by the memory benchmark
+MEMORY_MODES = {
+    'full': "processor.extract_all_features(path)",
+    'lean': "processor.extract_lean_features(path)",
+    'framed': "processor.extract_framed_features(path)"
+}
+
+
+def measure_memory(audio_file, mode, precision='double'):
+    # Peak RSS above the post-import baseline; a warm-up call on a short
+    # signal keeps one-off allocations (FFT plans, caches) out of the delta.
+    # VmHWM is per address space; ru_maxrss (the fallback) survives exec and
+    # can report the parent's peak.
+    code = (
+        "import json, resource, tracemalloc\n"
+        "import numpy as np\n"
+        "def peak_rss_kb():\n"
+        "    try:\n"
+        "        with open('/proc/self/status') as f:\n"
+        "            return next(int(line.split()[1]) for line in f if line.startswith('VmHWM'))\n"
+        "    except (OSError, StopIteration):\n"
+        "        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "from signal_processor import AudioSignalProcessor\n"
+        f"processor = AudioSignalProcessor(precision={precision!r})\n"
+        "processor.compute_spectral_features(np.zeros(4096, dtype=np.float32))\n"
+        f"path = {str(audio_file)!r}\n"
+        "baseline = peak_rss_kb()\n"
+        "tracemalloc.start()\n"
+        f"result = {MEMORY_MODES[mode]}\n"
+        "_, traced_peak = tracemalloc.get_traced_memory()\n"
+        "peak = peak_rss_kb()\n"
+        "print(json.dumps({'peak_rss_delta_mb': (peak - baseline) / 1024,\n"
+        "                  'traced_peak_mb': traced_peak / 2 ** 20}))\n"
+    )
+    return _run_python(code)
+
+
+def run_memory(args):
+    report = {'benchmark': 'memory', 'minutes': args.minutes, 'sr': args.sr,
+              'precision': args.precision, 'modes': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        audio_file = write_synthetic_wav(os.path.join(tmp, 'synthetic.wav'),
+                                         duration=args.minutes * 60, sr=args.sr)
+        for mode in MEMORY_MODES:
+            result = measure_memory(audio_file, mode, args.precision)
+            result = {name + '_per_minute': value / args.minutes for name, value in result.items()}
+            report['modes'][mode] = result
+            print(f"{mode:<7} peak RSS {result['peak_rss_delta_mb_per_minute']:8.1f} MB/min  "
+                  f"traced {result['traced_peak_mb_per_minute']:8.1f} MB/min")
+
+    failures = []
+    lean = report['modes']['lean']['peak_rss_delta_mb_per_minute']
+    if args.max_mb_per_minute is not None and lean > args.max_mb_per_minute:
+        failures.append(f"lean extraction peaked at {lean:.1f} MB/min > {args.max_mb_per_minute}")
+    report['failures'] = failures
+    return report
+
+
+# Synthetic audio grid for the suite: durations (s), sample rates, channels, formats
+SUITE_GRID = {
+    'durations': (2, 10, 30),
+    'sample_rates': (16000, 44100),
+    'channels': (1, 2),
+    'formats': ('wav', 'mp3')
+}
+QUICK_GRID = {
+    'durations': (5,),
+    'sample_rates': (16000, 44100),
+    'channels': (1,),
+    'formats': ('wav', 'mp3')
+}
+
+
+def time_stage(fn, repeats):
+    # Median/min wall time over repeats, then one traced run for peak memory
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((time.perf_counter() - start) * 1e3)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, {
+        'median_ms': statistics.median(timings),
+        'min_ms': min(timings),
+        'peak_mb': peak / 2 ** 20
+    }
+
+
+def benchmark_case(detector, client, path, repeats):
+    processor = detector.processor
+    stages = {}
+    (signal, sr), stages['load_wav'] = time_stage(lambda: processor.load_wav(path), repeats)
+    spectral, stages['compute_spectral_features'] = time_stage(
+        lambda: processor.compute_spectral_features(signal, sr), repeats)
+    _, stages['compute_phase_coherence'] = time_stage(
+        lambda: processor.compute_phase_coherence(spectral['phase']), repeats)
+    _, stages['compute_phase_velocity'] = time_stage(
+        lambda: processor.compute_phase_velocity(spectral['phase']), repeats)
+    _, stages['compute_spectral_inner_products'] = time_stage(
+        lambda: processor.compute_spectral_inner_products(spectral['magnitude']), repeats)
+    _, stages['extract_lean_features'] = time_stage(
+        lambda: processor.extract_lean_features(path), repeats)
+    _, stages['predict'] = time_stage(lambda: detector.predict(path), repeats)
+
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    def post():
+        response = client.post('/predict', data={'file': (io.BytesIO(content), Path(path).name)},
+                               content_type='multipart/form-data')
+        if response.status_code != 200:
+            raise RuntimeError(f"/predict returned {response.status_code}: {response.get_json()}")
+        return response
+
+    _, stages['api_predict'] = time_stage(post, repeats)
+    return {'n_samples': len(signal), 'sr': sr, 'bytes': len(content), 'stages': stages}
+
+
+def run_suite(args):
+    from detector import DeepfakeDetector
+    from app import create_app
+
+    grid = QUICK_GRID if args.quick else SUITE_GRID
+    detector = DeepfakeDetector(args.stats)
+    # Prediction cache disabled so every request is scored
+    flask_app = create_app({'PREDICTION_CACHE_BYTES': 0}, load_detector=False)
+    flask_app.extensions['deepfake']['detector'] = detector
+    client = flask_app.test_client()
+
+    report = {
+        'benchmark': 'suite',
+        'environment': {
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'fft_backend': detector.processor.fft_backend
+        },
+        'grid': {name: list(values) for name, values in grid.items()},
+        'repeats': args.repeats,
+        'cases': {},
+        'batch': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        files = []
+        for fmt in grid['formats']:
+            for sr in grid['sample_rates']:
+                for channels in grid['channels']:
+                    for duration in grid['durations']:
+                        name = f"{fmt}_{sr // 1000}k_{channels}ch_{duration}s"
+                        path = write_synthetic_audio(os.path.join(tmp, f"{name}.{fmt}"),
+                                                     duration, sr, channels, fmt)
+                        if path is None:
+                            print(f"{name}: skipped ({fmt} cannot be written here)")
+                            continue
+                        files.append(path)
+                        case = benchmark_case(detector, client, path, args.repeats)
+                        report['cases'][name] = case
+                        print(f"{name:<20} " + "  ".join(
+                            f"{stage} {result['median_ms']:.1f}"
+                            for stage, result in case['stages'].items()
+                            if stage in ('load_wav', 'compute_spectral_features',
+                                         'predict', 'api_predict')) + " ms")
+
+        for workers in (1, -1):
+            start = time.perf_counter()
+            results = detector.predict_batch(files, workers=workers)
+            elapsed = time.perf_counter() - start
+            errors = sum(1 for result in results if result.get('error'))
+            report['batch'][f"predict_batch_workers_{workers}"] = {
+                'files': len(files),
+                'errors': errors,
+                'seconds': elapsed,
+                'files_per_second': len(files) / elapsed if elapsed else 0.0
+            }
+            print(f"predict_batch (workers={workers}): {len(files)} files in {elapsed:.2f} s "
+                  f"({len(files) / elapsed:.1f} files/s, {errors} errors)")
+
+    report['failures'] = []
+    if args.baseline:
+        with open(args.baseline, 'r') as f:
+            baseline = json.load(f)
+        report['failures'] = compare_reports(baseline, report, args.max_regression,
+                                             args.max_memory_regression, args.min_ms)
+    return report
+
+
+def compare_reports(baseline, current, max_regression=0.25, max_memory_regression=0.25,
+                    min_ms=1.0):
+    # Stage-level regressions between two suite reports. Timings under
+    # min_ms of absolute change are treated as noise.
+    failures = []
+    for name, case in current.get('cases', {}).items():
+        base_case = baseline.get('cases', {}).get(name)
+        if base_case is None:
+            continue
+        for stage, result in case['stages'].items():
+            base = base_case['stages'].get(stage)
+            if base is None:
+                continue
+            slower = result['median_ms'] - base['median_ms']
+            if slower > min_ms and result['median_ms'] > base['median_ms'] * (1 + max_regression):
+                failures.append(f"{name} {stage}: {base['median_ms']:.1f} -> "
+                                f"{result['median_ms']:.1f} ms (+{slower / base['median_ms']:.0%})")
+            if result['peak_mb'] > base['peak_mb'] * (1 + max_memory_regression) and \
+                    result['peak_mb'] - base['peak_mb'] > 1.0:
+                failures.append(f"{name} {stage}: peak {base['peak_mb']:.1f} -> "
+                                f"{result['peak_mb']:.1f} MB")
+    for name, result in current.get('batch', {}).items():
+        base = baseline.get('batch', {}).get(name)
+        if base and result['files_per_second'] < base['files_per_second'] / (1 + max_regression):
+            failures.append(f"{name}: {base['files_per_second']:.1f} -> "
+                            f"{result['files_per_second']:.1f} files/s")
+    return failures
+
+
+def run_compare(args):
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    with open(args.current, 'r') as f:
+        current = json.load(f)
+    failures = compare_reports(baseline, current, args.max_regression,
+                               args.max_memory_regression, args.min_ms)
+    shared = set(baseline.get('cases', {})) & set(current.get('cases', {}))
+    print(f"Compared {len(shared)} cases: {len(failures)} regressions")
+    return {'benchmark': 'compare', 'baseline': args.baseline, 'current': args.current,
+            'failures': failures}
+
+
+def _audio_files(paths):
+    files = []
+    for path in map(Path, paths):
+        if path.is_dir():
+            files += sorted(p for p in path.glob('**/*') if p.suffix.lower() in ('.wav', '.mp3'))
+        else:
+            files.append(path)
+    return files
+
+
+def run_precision(args):
+    from signal_processor import AudioSignalProcessor, SCALAR_FEATURES
+    from detector import DeepfakeDetector, SCORED_METRICS
+
+    detectors = {
+        precision: DeepfakeDetector(args.stats, feature_mode=args.feature_mode,
+                                    processor=AudioSignalProcessor(precision=precision))
+        for precision in ('double', 'single')
+    }
+    reference = detectors['double']
+    # Drift is reported in units of the tighter class std of each metric
+    sigma = {metric: min(reference.human_stats[metric]['std'], reference.ai_stats[metric]['std'])
+             for metric in SCORED_METRICS}
+
+    report = {
+        'benchmark': 'precision',
+        'stats': args.stats,
+        'feature_mode': args.feature_mode,
+        'files': {},
+        'features': {},
+        'predictions': {}
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        files = _audio_files(args.audio)
+        if not files:
+            files = [write_synthetic_wav(os.path.join(tmp, f"synthetic_{sr // 1000}k_{duration}s.wav"),
+                                         duration, sr, seed=duration)
+                     for sr in (16000, 44100) for duration in (2, 10, 30)]
+
+        drifts = {name: [] for name in SCALAR_FEATURES}
+        timings = {'double': [], 'single': []}
+        agree = 0
+        confidence_deltas = []
+        for path in files:
+            results = {}
+            for precision, detector in detectors.items():
+                extract = lambda: detector.processor.extract_features(
+                    str(path), mode=args.feature_mode, lean=True)
+                features, timing = time_stage(extract, args.repeats)
+                timings[precision].append(timing['median_ms'])
+                results[precision] = (features, detector.score_features(features))
+            (double, double_result), (single, single_result) = results['double'], results['single']
+            entry = {}
+            for name in SCALAR_FEATURES:
+                delta = abs(float(single[name]) - float(double[name]))
+                relative = delta / max(abs(float(double[name])), 1e-12)
+                entry[name] = {'abs': delta, 'rel': relative}
+                if name in sigma:
+                    entry[name]['sigma'] = delta / sigma[name]
+                drifts[name].append(entry[name])
+            agree += double_result['prediction'] == single_result['prediction']
+            confidence_deltas.append(abs(double_result['confidence'] - single_result['confidence']))
+            report['files'][Path(path).name] = entry
+            print(f"{Path(path).name:<40} " + "  ".join(
+                f"{name} {entry[name]['rel']:.1e}" for name in SCALAR_FEATURES))
+
+    for name, values in drifts.items():
+        summary = {'max_abs': max(v['abs'] for v in values),
+                   'max_rel': max(v['rel'] for v in values),
+                   'mean_rel': float(np.mean([v['rel'] for v in values]))}
+        if name in sigma:
+            summary['max_sigma'] = max(v['sigma'] for v in values)
+        report['features'][name] = summary
+    report['predictions'] = {
+        'files': len(files),
+        'agreement': agree / len(files),
+        'max_confidence_delta': max(confidence_deltas)
+    }
+    double_ms, single_ms = sum(timings['double']), sum(timings['single'])
+    report['timing'] = {'double_ms': double_ms, 'single_ms': single_ms,
+                        'speedup': double_ms / single_ms if single_ms else 0.0}
+
+    print(f"\n{'feature':<20}{'max rel':>12}{'mean rel':>12}{'max sigma':>12}")
+    for name, summary in report['features'].items():
+        max_sigma = f"{summary['max_sigma']:.1e}" if 'max_sigma' in summary else '-'
+        print(f"{name:<20}{summary['max_rel']:>12.1e}{summary['mean_rel']:>12.1e}{max_sigma:>12}")
+    print(f"Predictions agree on {agree}/{len(files)} files "
+          f"(max confidence change {report['predictions']['max_confidence_delta']:.1e})")
+    print(f"Extraction: double {double_ms:.1f} ms, single {single_ms:.1f} ms "
+          f"({report['timing']['speedup']:.2f}x)")
+
+    failures = []
+    for name, summary in report['features'].items():
+        if summary.get('max_sigma', 0.0) > args.max_sigma_drift:
+            failures.append(f"{name} drifted {summary['max_sigma']:.2e} std > {args.max_sigma_drift}")
+    if agree < len(files):
+        failures.append(f"predictions differ on {len(files) - agree} of {len(files)} files")
+    report['failures'] = failures
+    return report
+
+
+def run_startup(args):
+    report = {'benchmark': 'startup', 'imports': {}, 'first_prediction': {}}
+    for module in ['signal_processor', 'detector', 'app']:
+        report['imports'][module] = measure_import(module, args.repeats)
+        print(f"import {module:<18} {report['imports'][module]['median_ms']:8.1f} ms")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {'wav': write_synthetic_wav(os.path.join(tmp, 'synthetic.wav'))}
+        if args.audio:
+            files[Path(args.audio).suffix.lstrip('.').lower() or 'audio'] = args.audio
+        for label, audio_file in files.items():
+            result = measure_first_prediction(audio_file)
+            report['first_prediction'][label] = result
+            print(f"first prediction ({label}): {result['total_to_first_result_ms']:.1f} ms "
+                  f"(import {result['import_ms']:.1f}, init {result['init_ms']:.1f}, "
+                  f"predict {result['first_predict_ms']:.1f}, warm {result['second_predict_ms']:.1f}); "
+                  f"heavy modules: {result['heavy_modules_loaded'] or 'none'}")
+
+    failures = []
+    slowest_import = max(r['median_ms'] for r in report['imports'].values())
+    if args.max_import_ms is not None and slowest_import > args.max_import_ms:
+        failures.append(f"import took {slowest_import:.1f} ms > {args.max_import_ms} ms")
+    wav = report['first_prediction']['wav']
+    if args.max_first_predict_ms is not None and \
+            wav['total_to_first_result_ms'] > args.max_first_predict_ms:
+        failures.append(f"first WAV prediction took {wav['total_to_first_result_ms']:.1f} ms "
+                        f"> {args.max_first_predict_ms} ms")
+    if wav['heavy_modules_loaded']:
+        failures.append(f"WAV prediction imported {wav['heavy_modules_loaded']}")
+    report['failures'] = failures
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Deepfake detection backend benchmarks')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    startup = subparsers.add_parser('startup', help='Import and first-prediction latency')
+    startup.add_argument('--audio', help='Extra audio file (e.g. an MP3) to time')
+    startup.add_argument('--repeats', type=int, default=5)
+    startup.add_argument('--max-import-ms', type=float)
+    startup.add_argument('--max-first-predict-ms', type=float)
+    startup.add_argument('--output', help='Write the report as JSON')
+    startup.set_defaults(func=run_startup)
+
+    memory = subparsers.add_parser('memory', help='Peak memory per minute of audio')
+    memory.add_argument('--minutes', type=float, default=1.0)
+    memory.add_argument('--sr', type=int, default=44100)
+    memory.add_argument('--precision', choices=['double', 'single'], default='double')
+    memory.add_argument('--max-mb-per-minute', type=float,
+                        help='Fail if lean extraction exceeds this peak RSS per minute')
+    memory.add_argument('--output', help='Write the report as JSON')
+    memory.set_defaults(func=run_memory)
+
+    suite = subparsers.add_parser('suite', help='Per-stage timings and memory on synthetic audio')
+    suite.add_argument('--quick', action='store_true', help='Small grid (4 clips of 5 s)')
+    suite.add_argument('--repeats', type=int, default=3)
+    suite.add_argument('--stats', default='reference_stats.json')
+    suite.add_argument('--output', help='Write the report as JSON')
+    suite.add_argument('--baseline', help='Fail on regressions against this suite report')
+    compare = subparsers.add_parser('compare', help='Compare two suite reports')
+    compare.add_argument('baseline')
+    compare.add_argument('current')
+    compare.add_argument('--output', help='Write the report as JSON')
+    for sub in (suite, compare):
+        sub.add_argument('--max-regression', type=float, default=0.25,
+                         help='Allowed slowdown per stage (0.25 = 25%%)')
+        sub.add_argument('--max-memory-regression', type=float, default=0.25)
+        sub.add_argument('--min-ms', type=float, default=1.0,
+                         help='Ignore timing changes smaller than this')
+    suite.set_defaults(func=run_suite)
+    compare.set_defaults(func=run_compare)
+
+    precision = subparsers.add_parser('precision',
+                                      help='Single vs double precision feature drift')
+    precision.add_argument('audio', nargs='*',
+                           help='Audio files or directories (default: synthetic clips)')
+    precision.add_argument('--stats', default='reference_stats.json')
+    precision.add_argument('--feature-mode', choices=['global', 'framed'], default='global')
+    precision.add_argument('--repeats', type=int, default=3)
+    precision.add_argument('--max-sigma-drift', type=float, default=0.01,
+                           help='Fail if a scored feature moves more than this many reference stds')
+    precision.add_argument('--output', help='Write the report as JSON')
+    precision.set_defaults(func=run_precision)
+
+    args = parser.parse_args()
+    report = args.func(args)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+        print(f"Report saved to {args.output}")
+    for failure in report.get('failures', []):
+        print(f"[FAIL] {failure}")
+    if report.get('failures'):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
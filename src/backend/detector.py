@@ -5,15 +5,92 @@ Output: Class label + confidence score based on geometric distance
 """
 
 import json
+import time
+import hashlib
 import numpy as np
 from pathlib import Path
-from signal_processor import AudioSignalProcessor
+from functools import partial
+from signal_processor import AudioSignalProcessor, FEATURE_MODES
+from parallel import parallel_map, resolve_workers
+from audio_io import is_path
+import metrics
+
+# Metrics used for scoring (column order of score_matrix input) and their
+# weights, based on discriminative power
+SCORED_METRICS = ('phase_coherence', 'phase_velocity', 'spectral_entropy')
+# Progressive prediction strategies per feature mode (the first is the
+# default) and defaults. Global features shift with the analyzed length, so
+# global mode only stops early on an explicit budget, never on confidence;
+# averaging per-segment global features ('sampled') is biased outright.
+PROGRESSIVE_STRATEGIES = {
+    'global': ('prefix',),
+    'framed': ('sampled', 'prefix')
+}
+DEFAULT_CONFIDENCE_THRESHOLD = 0.7
+DEFAULT_PROGRESSIVE_MIN_SECONDS = 4.0
+
+METRIC_WEIGHTS = {
+    'spectral_entropy': 0.80,    # Highest weight
+    'phase_coherence': 0.10,     # Medium weight
+    'phase_velocity': 0.10       # Lower weight
+}
+
+# Per-process detector used by process-pool batch workers
+_worker_detector = None
+
+
+def _init_worker(detector):
+    global _worker_detector
+    _worker_detector = detector
+
+
+def _source_label(source):
+    # In-memory sources are labelled by type, not by their contents
+    return str(source) if is_path(source) else f'<{type(source).__name__}>'
+
+
+def _safe_predict(detector, filepath, verbose=False):
+    try:
+        result = detector.predict(filepath, verbose=verbose)
+        result['filepath'] = _source_label(filepath)
+        return result
+    except Exception as e:
+        return {
+            'filepath': _source_label(filepath),
+            'error': str(e),
+            'prediction': None,
+            'confidence': None
+        }
+
+
+def _worker_predict(filepath, verbose=False):
+    return _safe_predict(_worker_detector, filepath, verbose)
 
 
 class DeepfakeDetector:
-    def __init__(self, reference_stats_file='reference_stats.json'):
-        self.processor = AudioSignalProcessor()
+    def __init__(self, reference_stats_file='reference_stats.json', feature_mode='global',
+                 processor=None):
+        if feature_mode not in FEATURE_MODES:
+            raise ValueError(f"Unknown feature mode: {feature_mode}. Use one of {FEATURE_MODES}.")
+        self.feature_mode = feature_mode
+        self.processor = processor or AudioSignalProcessor()
         self.stats = self._load_stats(reference_stats_file)
+        # Framed and global features have different distributions
+        stats_mode = self.stats.get('feature_mode', 'global')
+        if stats_mode != feature_mode:
+            raise ValueError(
+                f"Reference statistics in {reference_stats_file} were computed in "
+                f"'{stats_mode}' mode, detector requested '{feature_mode}'.\n"
+                f"Run: python reference_stats.py --feature-mode {feature_mode} "
+                "to generate matching statistics."
+            )
+        expected_sr = self.processor.target_sr if self.processor.resample else None
+        if self.stats.get('resample_sr') != expected_sr:
+            raise ValueError(
+                f"Reference statistics in {reference_stats_file} were computed with "
+                f"resample_sr={self.stats.get('resample_sr')}, processor uses {expected_sr}.\n"
+                "Run: python reference_stats.py --resample to generate matching statistics."
+            )
         # Extract statistics for all three metrics
         self.human_stats = {
             'phase_coherence': self.stats['human']['phase_coherence'],
@@ -25,6 +102,21 @@ class DeepfakeDetector:
             'phase_velocity': self.stats['nonhuman']['phase_velocity'],
             'spectral_entropy': self.stats['nonhuman']['spectral_entropy']
         }
+        # Class means, stds and weights as arrays in SCORED_METRICS order
+        self._weights = np.array([METRIC_WEIGHTS[m] for m in SCORED_METRICS])
+        self._mu_human = np.array([self.human_stats[m]['mean'] for m in SCORED_METRICS])
+        self._sigma_human = np.array([self.human_stats[m]['std'] for m in SCORED_METRICS]) + 1e-6
+        self._mu_ai = np.array([self.ai_stats[m]['mean'] for m in SCORED_METRICS])
+        self._sigma_ai = np.array([self.ai_stats[m]['std'] for m in SCORED_METRICS]) + 1e-6
+        # Identifies reference stats + feature settings (cache key component)
+        self.version = self._compute_version()
+    
+    def _compute_version(self):
+        payload = json.dumps({
+            'stats': self.stats,
+            'features': self.processor.feature_settings(self.feature_mode)
+        }, sort_keys=True)
+        return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:12]
     
     def _load_stats(self, filepath):
         if not Path(filepath).exists():
@@ -36,41 +128,46 @@ class DeepfakeDetector:
         with open(filepath, 'r') as f:
             return json.load(f)
     
-    def _compute_geometric_distance(self, features):
-        # Weights based on discriminative power
-        weights = {
-            'spectral_entropy': 0.80,    # Highest weight
-            'phase_coherence': 0.10,     # Medium weight
-            'phase_velocity': 0.10       # Lower weight
-        }
-        
-        distances_human = []
-        distances_ai = []
-        
-        metrics = ['phase_coherence', 'phase_velocity', 'spectral_entropy']
-        
-        for metric in metrics:
-            value = features[metric]
-            
-            mu_h = self.human_stats[metric]['mean']
-            sigma_h = self.human_stats[metric]['std'] + 1e-6
-            
-            mu_ai = self.ai_stats[metric]['mean']
-            sigma_ai = self.ai_stats[metric]['std'] + 1e-6
-            
-            # Standardized distances per metric
-            d_h = np.abs(value - mu_h) / sigma_h
-            d_ai = np.abs(value - mu_ai) / sigma_ai
-            
-            # Apply weights
-            weight = weights[metric]
-            distances_human.append(weight * d_h)
-            distances_ai.append(weight * d_ai)
-        
+    def _feature_matrix(self, features):
+        # (n_samples, n_metrics) float matrix from a plain array (columns in
+        # SCORED_METRICS order) or a structured array with named fields
+        features = np.asarray(features)
+        if features.dtype.names is not None:
+            return np.column_stack([features[m].astype(np.float64) for m in SCORED_METRICS])
+        matrix = np.atleast_2d(features.astype(np.float64, copy=False))
+        if matrix.ndim != 2 or matrix.shape[1] != len(SCORED_METRICS):
+            raise ValueError(
+                f"Expected an (n_samples, {len(SCORED_METRICS)}) feature matrix "
+                f"with columns {SCORED_METRICS}, got shape {features.shape}"
+            )
+        return matrix
+    
+    def score_matrix(self, features):
+        # Scores every row of a feature matrix at once (e.g. a feature store
+        # rescored after a reference stats update, without re-extracting)
+        matrix = self._feature_matrix(features)
+        # Weighted standardized distances per metric
+        weighted_h = self._weights * np.abs(matrix - self._mu_human) / self._sigma_human
+        weighted_ai = self._weights * np.abs(matrix - self._mu_ai) / self._sigma_ai
         # Weighted Euclidean distance
-        d_human = np.sqrt(np.sum(np.array(distances_human)**2))
-        d_ai = np.sqrt(np.sum(np.array(distances_ai)**2))
-        
+        d_human = np.sqrt(np.sum(weighted_h ** 2, axis=1))
+        d_ai = np.sqrt(np.sum(weighted_ai ** 2, axis=1))
+        # Confidence based on relative distances
+        confidence = 1.0 - np.minimum(d_human, d_ai) / (np.maximum(d_human, d_ai) + 1e-6)
+        return {
+            'prediction': np.where(d_ai < d_human, 'ai', 'human'),
+            'confidence': confidence,
+            'distance_to_human': d_human,
+            'distance_to_ai': d_ai
+        }
+    
+    def _compute_geometric_distance(self, features):
+        # Single-sample path of score_matrix on the precomputed arrays
+        values = np.array([features[m] for m in SCORED_METRICS], dtype=np.float64)
+        d_human = np.sqrt(np.sum((self._weights * np.abs(values - self._mu_human)
+                                  / self._sigma_human) ** 2))
+        d_ai = np.sqrt(np.sum((self._weights * np.abs(values - self._mu_ai)
+                               / self._sigma_ai) ** 2))
         # Confidence based on relative distances
         min_dist = min(d_human, d_ai)
         max_dist = max(d_human, d_ai)
@@ -79,9 +176,25 @@ class DeepfakeDetector:
         return d_human, d_ai, confidence
     
     def predict(self, audio_filepath, verbose=False):
-        # Extract features
-        features = self.processor.extract_all_features(audio_filepath)
+        # audio_filepath: path, bytes-like buffer or file-like object
+        with metrics.in_flight('predict'), metrics.stage('predict'):
+            try:
+                # Extract features
+                features = self.processor.extract_features(audio_filepath, mode=self.feature_mode,
+                                                           lean=True)
+            except Exception:
+                metrics.inc('deepfake_prediction_errors_total')
+                raise
+            
+            with metrics.stage('scoring'):
+                result = self.score_features(features)
+        metrics.inc('deepfake_predictions_total', prediction=result['prediction'])
         
+        return result
+    
+    def score_features(self, features):
+        # Prediction result from already extracted scalar features (also
+        # used by streaming sessions and progressive prediction)
         # Compute geometric distances
         d_h, d_ai, confidence = self._compute_geometric_distance(features)
         
@@ -104,22 +217,180 @@ class DeepfakeDetector:
         
         return result
     
-    def predict_batch(self, audio_files_list, verbose=False):
-        predictions = []
-        for filepath in audio_files_list:
+    def _progressive_steps(self, n_samples, sr, strategy, min_seconds, growth, segment_seconds):
+        # Yields (start, stop) spans; each step adds one span to the analysis
+        if strategy == 'prefix':
+            # Geometrically growing prefix: [0, min), [min, min*growth), ...
+            stop = 0
+            length = max(int(min_seconds * sr), 2)
+            while stop < n_samples:
+                start, stop = stop, min(length, n_samples)
+                yield start, stop
+                length = int(length * growth)
+            return
+        # Fixed-length segments spread over the whole clip, coarse to fine
+        # (start, middle, quarters, ...), so an early exit has still seen
+        # audio from across the file
+        segment = max(int(segment_seconds * sr), 2)
+        n_slots = max(1, n_samples // segment)
+        seen = set()
+        step = 1 << (n_slots - 1).bit_length()
+        while step:
+            for slot in range(0, n_slots, step):
+                if slot not in seen:
+                    seen.add(slot)
+                    start = slot * n_samples // n_slots
+                    yield start, min(start + segment, n_samples)
+            step //= 2
+    
+    def predict_progressive(self, audio_filepath, confidence_threshold=DEFAULT_CONFIDENCE_THRESHOLD,
+                            min_seconds=DEFAULT_PROGRESSIVE_MIN_SECONDS, max_seconds=None,
+                            time_budget=None, strategy=None, growth=2.0, segment_seconds=2.0):
+        # Early-exit prediction: scores a growing part of the clip and stops
+        # once confidence >= confidence_threshold (after at least min_seconds,
+        # framed mode only), or when max_seconds of audio or time_budget
+        # seconds of compute are used up. Adds analyzed_seconds,
+        # total_seconds, steps and stop_reason ('confident', 'complete',
+        # 'sample_budget', 'time_budget').
+        strategies = PROGRESSIVE_STRATEGIES[self.feature_mode]
+        strategy = strategy or strategies[0]
+        if strategy not in strategies:
+            raise ValueError(f"Unknown strategy for {self.feature_mode} mode: {strategy}. "
+                             f"Use one of {strategies}.")
+        if growth <= 1:
+            raise ValueError("growth must be greater than 1")
+        started = time.perf_counter()
+        processor = self.processor
+        framed = self.feature_mode == 'framed'
+        
+        with metrics.in_flight('predict'), metrics.stage('predict_progressive'):
             try:
-                result = self.predict(filepath, verbose=verbose)
-                result['filepath'] = str(filepath)
-                predictions.append(result)
-            except Exception as e:
-                predictions.append({
-                    'filepath': str(filepath),
-                    'error': str(e),
-                    'prediction': None,
-                    'confidence': None
-                })
+                sr, n_samples, read = processor.open_segments(audio_filepath)
+                if n_samples < 2:
+                    raise ValueError("Audio too short to analyze")
+                max_samples = n_samples if max_seconds is None \
+                    else min(n_samples, max(int(max_seconds * sr), 2))
+                min_samples = min(int(min_seconds * sr), max_samples)
+                
+                # Running sums of per-frame features (framed); global mode
+                # rescores the whole prefix
+                sums = np.zeros(5)
+                next_frame = 0
+                analyzed = 0
+                steps = 0
+                result = None
+                stop_reason = 'complete'
+                last_step = 0.0
+                if framed or time_budget is not None:
+                    steps_iter = self._progressive_steps(n_samples, sr, strategy, min_seconds,
+                                                         growth, segment_seconds)
+                else:
+                    # Global scores only count once the budget or clip is
+                    # reached, so shorter prefixes would be wasted work
+                    steps_iter = [(0, max_samples)]
+                for start, stop in steps_iter:
+                    stop = min(stop, start + max_samples - analyzed)
+                    if stop <= start:
+                        break
+                    step_started = time.perf_counter()
+                    # Prefixes end at stop; sampled segments add their length
+                    analyzed = stop if strategy == 'prefix' else analyzed + stop - start
+                    if framed:
+                        if strategy == 'prefix':
+                            # Frames continue where the previous prefix left off
+                            start = next_frame
+                        span = read(start, stop)
+                        frame_size, hop_size = processor.frame_size, processor.hop_size
+                        if len(span) < frame_size:
+                            # Shorter than one frame: as in iter_frames, a prefix
+                            # only analyzes it when it is the whole clip (a tail
+                            # after full frames is dropped); a sampled segment
+                            # is analyzed as a single frame
+                            whole_clip = stop == n_samples and next_frame == 0
+                            offsets = [0] if whole_clip or strategy == 'sampled' else []
+                        else:
+                            offsets = range(0, len(span) - frame_size + 1, hop_size)
+                        sums += processor.frame_sums(span[offset:offset + frame_size]
+                                                     for offset in offsets)
+                        if strategy == 'prefix':
+                            next_frame = start + (offsets[-1] + hop_size if len(offsets) else 0)
+                        if sums[4] == 0:
+                            continue
+                        features = processor.framed_features_from_sums(sums, sr)
+                    else:
+                        features = processor.compute_lean_features(read(0, stop))
+                    steps += 1
+                    result = self.score_features(features)
+                    last_step = time.perf_counter() - step_started
+                    
+                    if analyzed >= n_samples:
+                        stop_reason = 'complete'
+                        break
+                    if framed and analyzed >= min_samples and \
+                            result['confidence'] >= confidence_threshold:
+                        stop_reason = 'confident'
+                        break
+                    if analyzed >= max_samples:
+                        stop_reason = 'sample_budget'
+                        break
+                    # Stop if the next step (about `growth` times the last
+                    # one for prefixes) would overrun the budget
+                    next_cost = last_step * (growth if strategy == 'prefix' and not framed else 1)
+                    if time_budget is not None and \
+                            time.perf_counter() - started + next_cost > time_budget:
+                        stop_reason = 'time_budget'
+                        break
+                if result is None:
+                    raise ValueError("No audio analyzed")
+            except Exception:
+                metrics.inc('deepfake_prediction_errors_total')
+                raise
         
-        return predictions
+        result.update({
+            'analyzed_seconds': analyzed / sr,
+            'total_seconds': n_samples / sr,
+            'steps': steps,
+            'stop_reason': stop_reason,
+            'early_exit': stop_reason != 'complete'
+        })
+        if framed:
+            result['n_frames'] = int(sums[4])
+        metrics.inc('deepfake_predictions_total', prediction=result['prediction'])
+        metrics.inc('deepfake_progressive_stops_total', reason=stop_reason)
+        return result
+    
+    def iter_predict_batch(self, audio_files_list, verbose=False, workers=1,
+                           executor='process', chunksize=1, max_in_flight=None,
+                           ordered=True, start_method=None):
+        # Yields (index, result) pairs; with ordered=False results come back
+        # as soon as they complete. workers=-1 uses all cores; never more
+        # processes than files
+        workers = min(resolve_workers(workers), max(len(audio_files_list), 1))
+        if workers == 1:
+            for index, filepath in enumerate(audio_files_list):
+                yield index, _safe_predict(self, filepath, verbose)
+            return
+        
+        if executor == 'process':
+            # Each worker process gets its own copy of this detector once
+            fn = partial(_worker_predict, verbose=verbose)
+            initializer, initargs = _init_worker, (self,)
+        else:
+            fn = partial(_safe_predict, self, verbose=verbose)
+            initializer, initargs = None, ()
+        
+        yield from parallel_map(fn, audio_files_list, workers=workers, executor=executor,
+                                chunksize=chunksize, max_in_flight=max_in_flight,
+                                ordered=ordered, initializer=initializer,
+                                initargs=initargs, start_method=start_method)
+    
+    def predict_batch(self, audio_files_list, verbose=False, workers=1,
+                      executor='process', chunksize=1, max_in_flight=None,
+                      start_method=None):
+        return [result for _, result in self.iter_predict_batch(
+            audio_files_list, verbose=verbose, workers=workers, executor=executor,
+            chunksize=chunksize, max_in_flight=max_in_flight, ordered=True,
+            start_method=start_method)]
     
     def get_reference_statistics(self):
         return {
@@ -128,17 +399,19 @@ class DeepfakeDetector:
         }
 
 
-def create_detector(reference_stats_file='reference_stats.json'):
-    return DeepfakeDetector(reference_stats_file)
+def create_detector(reference_stats_file='reference_stats.json', feature_mode='global'):
+    return DeepfakeDetector(reference_stats_file, feature_mode=feature_mode)
 
 
 if __name__ == '__main__':
     import sys
     
     if len(sys.argv) < 2:
-        print("Usage: python detector.py <audio_file.wav>")
+        print("Usage: python detector.py <audio_file.wav> [stats_file] [global|framed]")
         sys.exit(1)
     
-    detector = DeepfakeDetector()
+    stats_file = sys.argv[2] if len(sys.argv) > 2 else 'reference_stats.json'
+    feature_mode = sys.argv[3] if len(sys.argv) > 3 else 'global'
+    detector = DeepfakeDetector(stats_file, feature_mode=feature_mode)
     result = detector.predict(sys.argv[1])
     print(f"\nPrediction: {result['prediction']} (confidence: {result['confidence']:.1%})")
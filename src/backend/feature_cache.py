@@ -0,0 +1,58 @@
+"""
+Feature Cache Module
+Append-only on-disk cache of per-file scalar features, keyed by file path,
+size, mtime and processor settings. Entries are flushed as soon as they are
+computed, so an interrupted build resumes where it stopped.
+"""
+
+import os
+import json
+import hashlib
+from pathlib import Path
+
+
+def settings_key(settings):
+    payload = json.dumps(settings, sort_keys=True)
+    return hashlib.sha1(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def file_key(filepath, settings):
+    filepath = Path(filepath).resolve()
+    st = filepath.stat()
+    return f"{filepath}|{st.st_size}|{st.st_mtime_ns}|{settings_key(settings)}"
+
+
+class FeatureCache:
+    def __init__(self, cache_file):
+        self.cache_file = Path(cache_file)
+        self.entries = {}
+        self._load()
+
+    def _load(self):
+        if not self.cache_file.exists():
+            return
+        with open(self.cache_file, 'r') as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    # Partial last line from an interrupted run
+                    continue
+                self.entries[entry['key']] = entry['features']
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, filepath, settings):
+        try:
+            return self.entries.get(file_key(filepath, settings))
+        except OSError:
+            return None
+
+    def put(self, filepath, settings, features):
+        key = file_key(filepath, settings)
+        self.entries[key] = features
+        with open(self.cache_file, 'a') as f:
+            f.write(json.dumps({'key': key, 'features': features}) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
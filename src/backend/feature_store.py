@@ -0,0 +1,408 @@
+"""
+Feature Store Module
+Persistent columnar store of per-file features: one raw binary file per
+column (memory-mapped for reads) plus a JSON manifest, with rows keyed by the
+SHA-256 of the file contents. Rows are only ever appended; a row counts once
+every column holds it, so an interrupted ingest keeps all complete rows.
+Reference statistics, rescoring and offline evaluation run over the stored
+columns without decoding any audio.
+"""
+
+import os
+import json
+import numpy as np
+from pathlib import Path
+from functools import partial
+from signal_processor import AudioSignalProcessor
+from reference_stats import RunningStats, METRICS, LABELS, print_statistics
+from prediction_cache import file_digest
+from parallel import parallel_map, resolve_workers
+
+# Scalar columns (name -> dtype); the optional spectrum column holds
+# spectrum_bins float32 values per row
+COLUMNS = {
+    'key': np.dtype('S64'),
+    'label': np.dtype('S16'),
+    'phase_coherence': np.dtype('<f8'),
+    'phase_velocity': np.dtype('<f8'),
+    'spectral_entropy': np.dtype('<f8'),
+    'spectral_l2_norm': np.dtype('<f8'),
+    'sr': np.dtype('<i8'),
+    'n_samples': np.dtype('<i8')
+}
+FEATURE_COLUMNS = ('phase_coherence', 'phase_velocity', 'spectral_entropy',
+                   'spectral_l2_norm', 'sr', 'n_samples')
+SPECTRUM_DTYPE = np.dtype('<f4')
+MANIFEST = 'manifest.json'
+
+
+def downsample_spectrum(magnitude, n_bins):
+    # log10 of the mean magnitude in n_bins equal-width frequency bands
+    magnitude = np.asarray(magnitude, dtype=np.float64)
+    if len(magnitude) >= n_bins:
+        edges = np.linspace(0, len(magnitude), n_bins + 1).astype(np.int64)
+        bands = np.add.reduceat(magnitude, edges[:-1]) / np.diff(edges)
+    else:
+        bands = np.interp(np.linspace(0, len(magnitude) - 1, n_bins),
+                          np.arange(len(magnitude)), magnitude)
+    return np.log10(bands + 1e-10).astype(SPECTRUM_DTYPE)
+
+
+class FeatureStore:
+    def __init__(self, directory, settings=None, spectrum_bins=0, readonly=False):
+        # settings: processor.feature_settings(mode) the rows were extracted
+        # with; required to create a store, checked when opening one
+        self.directory = Path(directory)
+        self.readonly = readonly
+        manifest_path = self.directory / MANIFEST
+        if manifest_path.exists():
+            with open(manifest_path, 'r') as f:
+                self.manifest = json.load(f)
+            if settings is not None and settings != self.manifest['settings']:
+                raise ValueError(
+                    f"Feature store {directory} was built with settings "
+                    f"{self.manifest['settings']}, requested {settings}"
+                )
+        else:
+            if readonly or settings is None:
+                raise FileNotFoundError(f"Feature store not found: {directory}")
+            self.directory.mkdir(parents=True, exist_ok=True)
+            self.manifest = {
+                'format': 1,
+                'settings': settings,
+                'spectrum_bins': int(spectrum_bins),
+                'columns': {name: dtype.str for name, dtype in COLUMNS.items()}
+            }
+            with open(manifest_path, 'w') as f:
+                json.dump(self.manifest, f, indent=2)
+
+        self.settings = self.manifest['settings']
+        self.spectrum_bins = self.manifest['spectrum_bins']
+        self._handles = {}
+        self._count = self._committed_rows()
+        if not readonly:
+            self._truncate(self._count)
+        self._rows_by_key = {key.decode('ascii'): row
+                             for row, key in enumerate(self.column('key'))}
+
+    def _column_path(self, name):
+        return self.directory / f"{name}.bin"
+
+    def _row_size(self, name):
+        if name == 'spectrum':
+            return SPECTRUM_DTYPE.itemsize * self.spectrum_bins
+        return COLUMNS[name].itemsize
+
+    def _column_names(self):
+        return list(COLUMNS) + (['spectrum'] if self.spectrum_bins else [])
+
+    def _committed_rows(self):
+        counts = []
+        for name in self._column_names():
+            path = self._column_path(name)
+            counts.append(path.stat().st_size // self._row_size(name) if path.exists() else 0)
+        paths_file = self.directory / 'paths.jsonl'
+        if paths_file.exists():
+            with open(paths_file, 'rb') as f:
+                counts.append(sum(1 for line in f if line.endswith(b'\n')))
+        else:
+            counts.append(0)
+        return min(counts)
+
+    def _truncate(self, count):
+        # Drop partial rows left by an interrupted append
+        for name in self._column_names():
+            path = self._column_path(name)
+            if path.exists():
+                os.truncate(path, count * self._row_size(name))
+        paths_file = self.directory / 'paths.jsonl'
+        if paths_file.exists():
+            with open(paths_file, 'rb') as f:
+                lines = f.readlines()[:count]
+            with open(paths_file, 'wb') as f:
+                f.writelines(lines)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, key):
+        return key in self._rows_by_key
+
+    def row_of(self, key):
+        return self._rows_by_key.get(key)
+
+    def _handle(self, name):
+        if name not in self._handles:
+            filename = 'paths.jsonl' if name == 'path' else f"{name}.bin"
+            self._handles[name] = open(self.directory / filename, 'ab')
+        return self._handles[name]
+
+    def append(self, rows):
+        # rows: dicts with 'key', 'label', 'path', the FEATURE_COLUMNS and,
+        # when the store keeps spectra, 'spectrum'. Rows whose key is already
+        # stored are skipped. Returns the number of rows written.
+        if self.readonly:
+            raise ValueError("Feature store is opened read-only")
+        # Duplicate contents keep their first occurrence
+        unique = {}
+        for row in rows:
+            if row['key'] not in self._rows_by_key:
+                unique.setdefault(row['key'], row)
+        rows = list(unique.values())
+        if not rows:
+            return 0
+        # Build every column before writing, so a bad row writes nothing
+        columns = {name: np.array([row.get(name, '') if name == 'label' else row[name]
+                                   for row in rows], dtype=dtype)
+                   for name, dtype in COLUMNS.items()}
+        if self.spectrum_bins:
+            columns['spectrum'] = np.array([row['spectrum'] for row in rows],
+                                           dtype=SPECTRUM_DTYPE)
+            if columns['spectrum'].shape != (len(rows), self.spectrum_bins):
+                raise ValueError(f"Expected spectra with {self.spectrum_bins} bins")
+        for name, values in columns.items():
+            self._handle(name).write(values.tobytes())
+        # Paths last: a row is committed once its path line is complete
+        self._handle('path').write(b''.join(
+            (json.dumps(str(row.get('path', ''))) + '\n').encode('utf-8') for row in rows))
+        self.flush()
+        for row in rows:
+            self._rows_by_key[row['key']] = self._count
+            self._count += 1
+        return len(rows)
+
+    def flush(self):
+        for handle in self._handles.values():
+            handle.flush()
+
+    def close(self):
+        for handle in self._handles.values():
+            handle.close()
+        self._handles = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def column(self, name):
+        # Read-only memory map of a column (committed rows only)
+        if name == 'path':
+            return self.paths()
+        if name == 'spectrum':
+            if not self.spectrum_bins:
+                raise ValueError("Feature store has no spectrum column")
+            dtype, shape = SPECTRUM_DTYPE, (self._count, self.spectrum_bins)
+        elif name in COLUMNS:
+            dtype, shape = COLUMNS[name], (self._count,)
+        else:
+            raise ValueError(f"Unknown column: {name}")
+        if self._count == 0:
+            return np.empty(shape, dtype=dtype)
+        return np.memmap(self._column_path(name), dtype=dtype, mode='r', shape=shape)
+
+    def paths(self):
+        with open(self.directory / 'paths.jsonl', 'r', encoding='utf-8') as f:
+            return [json.loads(line) for _, line in zip(range(self._count), f)]
+
+    def label_mask(self, label):
+        return self.column('label') == label.encode('ascii')
+
+    def to_array(self, columns=FEATURE_COLUMNS, mask=None):
+        # Structured array of the given columns (accepted by
+        # DeepfakeDetector.score_matrix)
+        table = np.empty(self._count, dtype=[(name, COLUMNS[name]) for name in columns])
+        for name in columns:
+            table[name] = self.column(name)
+        return table if mask is None else table[mask]
+
+    def compute_statistics(self):
+        # Reference statistics straight from the stored columns
+        result = {}
+        for label in LABELS:
+            mask = self.label_mask(label)
+            result[label] = {}
+            for metric in METRICS:
+                values = np.asarray(self.column(metric))[mask]
+                if len(values):
+                    mean = float(np.mean(values))
+                    m2 = float(np.sum((values - mean) ** 2))
+                    result[label][metric] = RunningStats(len(values), mean, m2).to_dict()
+                else:
+                    result[label][metric] = RunningStats().to_dict()
+        result['feature_mode'] = self.settings['feature_mode']
+        result['resample_sr'] = self.settings['target_sr'] if self.settings['resample'] else None
+        return result
+
+
+def carry_decision_threshold(stats, source_file):
+    # Rebuilt moments replace the ones in source_file, but its calibrated
+    # decision_threshold is kept (as merge_statistics does) when the
+    # feature settings match
+    if not os.path.exists(source_file):
+        return stats
+    with open(source_file) as f:
+        previous = json.load(f)
+    if 'decision_threshold' not in previous:
+        return stats
+    settings = {'feature_mode': previous.get('feature_mode', 'global'),
+                'resample_sr': previous.get('resample_sr')}
+    for key, value in settings.items():
+        if value != stats[key]:
+            raise ValueError(f"{source_file} has {key}={value}, store has {key}={stats[key]}; "
+                             "its decision_threshold does not apply")
+    stats['decision_threshold'] = previous['decision_threshold']
+    return stats
+
+
+def processor_from_settings(settings):
+    return AudioSignalProcessor(target_sr=settings['target_sr'],
+                                pad_to_fast_len=settings['pad_to_fast_len'],
+                                frame_size=settings['frame_size'],
+                                hop_size=settings['hop_size'],
+                                frame_window=settings['frame_window'],
+                                resample=settings['resample'],
+                                precision=settings.get('precision', 'double'))
+
+
+def _extract_row(processor, feature_mode, spectrum_bins, item):
+    # Runs in pool workers: returns (row, error) so one bad file does not
+    # abort the ingest
+    key, label, filepath = item
+    try:
+        # The full feature set is only needed for the spectrum column
+        features = processor.extract_features(str(filepath), mode=feature_mode,
+                                              lean=not spectrum_bins)
+        row = {name: features[name] for name in FEATURE_COLUMNS if name in features}
+        if 'n_samples' not in row:
+            row['n_samples'] = len(features['signal']) if 'signal' in features else 0
+        row.update({'key': key, 'label': label, 'path': str(filepath)})
+        if spectrum_bins:
+            row['spectrum'] = downsample_spectrum(features['magnitude'], spectrum_bins)
+        return row, None
+    except Exception as e:
+        return None, str(e)
+
+
+def ingest(store, labelled_files, workers=1, batch_size=256, verbose=True):
+    # labelled_files: (label, filepath) pairs. Files whose contents are
+    # already stored are skipped, so ingests are incremental and resumable.
+    settings = store.settings
+    if store.spectrum_bins and settings['feature_mode'] != 'global':
+        raise ValueError("Spectra are only stored for global feature mode")
+    todo = []
+    seen = set()
+    for label, filepath in labelled_files:
+        key = file_digest(filepath)
+        if key not in store and key not in seen:
+            seen.add(key)
+            todo.append((key, label, filepath))
+    if verbose:
+        print(f"{len(store)} rows stored, {len(todo)} files to process")
+
+    fn = partial(_extract_row, processor_from_settings(settings), settings['feature_mode'],
+                 store.spectrum_bins)
+    if resolve_workers(workers) == 1:
+        results = ((i, fn(item)) for i, item in enumerate(todo))
+    else:
+        results = parallel_map(fn, todo, workers=workers, ordered=False)
+
+    pending = []
+    written = 0
+    errors = 0
+    for i, (row, error) in results:
+        if error is not None:
+            errors += 1
+            if verbose:
+                print(f"Processing: {Path(todo[i][2]).name} → ERROR: {error}")
+            continue
+        pending.append(row)
+        if len(pending) >= batch_size:
+            written += store.append(pending)
+            pending = []
+    written += store.append(pending)
+    if verbose:
+        print(f"Stored {written} new rows ({errors} errors), {len(store)} total")
+    return written
+
+
+def evaluate(store, detector):
+    # Offline accuracy of the detector's reference statistics on the
+    # labelled rows, from stored features only
+    labels = np.char.decode(np.asarray(store.column('label')), 'ascii')
+    scores = detector.score_matrix(store.to_array())
+    predicted = np.where(scores['prediction'] == 'ai', 'nonhuman', 'human')
+    report = {'rows': len(store)}
+    for label in LABELS:
+        mask = labels == label
+        report[label] = {
+            'count': int(mask.sum()),
+            'accuracy': float(np.mean(predicted[mask] == label)) if mask.any() else None
+        }
+    labelled = np.isin(labels, LABELS)
+    report['accuracy'] = float(np.mean(predicted[labelled] == labels[labelled])) \
+        if labelled.any() else None
+    return report
+
+
+if __name__ == '__main__':
+    import argparse
+    from reference_stats import ReferenceStatisticsComputer
+
+    parser = argparse.ArgumentParser(description='Persistent columnar feature store')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    ingest_parser = subparsers.add_parser('ingest', help='Extract and store features')
+    ingest_parser.add_argument('store')
+    ingest_parser.add_argument('--human-dir', default='../../data/human')
+    ingest_parser.add_argument('--nonhuman-dir', default='../../data/nonhuman')
+    ingest_parser.add_argument('--feature-mode', choices=['global', 'framed'], default='global')
+    ingest_parser.add_argument('--resample', action='store_true')
+    ingest_parser.add_argument('--spectrum-bins', type=int, default=0,
+                               help='Also store a log spectrum with this many bands')
+    ingest_parser.add_argument('--workers', type=int, default=-1)
+
+    stats_parser = subparsers.add_parser('stats', help='Reference statistics from the store')
+    stats_parser.add_argument('store')
+    # No default: the live reference_stats.json is only replaced on purpose
+    stats_parser.add_argument('--output', required=True)
+    stats_parser.add_argument('--threshold-from', metavar='STATS_FILE',
+                              help='Copy decision_threshold from this file '
+                                   '(default: the existing --output)')
+
+    eval_parser = subparsers.add_parser('evaluate', help='Score stored rows against reference statistics')
+    eval_parser.add_argument('store')
+    eval_parser.add_argument('--stats', default='reference_stats.json')
+    args = parser.parse_args()
+
+    if args.command == 'ingest':
+        settings = AudioSignalProcessor(resample=args.resample).feature_settings(args.feature_mode)
+        computer = ReferenceStatisticsComputer(args.human_dir, args.nonhuman_dir)
+        files = [('human', f) for f in computer.get_wav_files(args.human_dir)]
+        files += [('nonhuman', f) for f in computer.get_wav_files(args.nonhuman_dir)]
+        with FeatureStore(args.store, settings, spectrum_bins=args.spectrum_bins) as store:
+            ingest(store, files, workers=args.workers)
+    elif args.command == 'stats':
+        store = FeatureStore(args.store, readonly=True)
+        stats = store.compute_statistics()
+        try:
+            carry_decision_threshold(stats, args.threshold_from or args.output)
+        except ValueError as e:
+            parser.error(str(e))
+        print_statistics(stats)
+        with open(args.output, 'w') as f:
+            json.dump(stats, f, indent=2)
+        print(f"Statistics saved to {args.output}")
+    else:
+        from detector import DeepfakeDetector
+        store = FeatureStore(args.store, readonly=True)
+        detector = DeepfakeDetector(args.stats, feature_mode=store.settings['feature_mode'],
+                                    processor=processor_from_settings(store.settings))
+        report = evaluate(store, detector)
+        for label in LABELS:
+            if report[label]['count']:
+                print(f"{label:<9} {report[label]['count']:>8} rows  "
+                      f"accuracy {report[label]['accuracy']:.1%}")
+        if report['accuracy'] is not None:
+            print(f"overall   {report['rows']:>8} rows  accuracy {report['accuracy']:.1%}")
@@ -0,0 +1,129 @@
+"""
+FFT Backend Module
+Real-input FFT backends (scipy.fft, numpy.fft, legacy scipy.fftpack)
+with optional fast-length padding and a per-host timing audit.
+"""
+
+import time
+import numpy as np
+
+# Importing scipy.fft (pocketfft with multithreading support)
+try:
+    import scipy.fft as sp_fft
+    HAS_SCIPY_FFT = True
+except ImportError:
+    HAS_SCIPY_FFT = False
+
+
+def _rfft_scipy(signal, n, workers):
+    return sp_fft.rfft(signal, n=n, workers=workers)
+
+
+def _rfft_numpy(signal, n, workers):
+    return np.fft.rfft(signal, n=n)
+
+
+def _rfft_fftpack(signal, n, workers):
+    # Legacy full complex transform, kept for audits against the old path
+    from scipy.fftpack import fft
+    return fft(signal, n=n)[..., :n // 2 + 1]
+
+
+BACKENDS = {
+    'scipy': _rfft_scipy,
+    'numpy': _rfft_numpy,
+    'fftpack': _rfft_fftpack
+}
+
+
+def available_backends():
+    if HAS_SCIPY_FFT:
+        return ['scipy', 'numpy', 'fftpack']
+    return ['numpy']
+
+
+def resolve_backend(name='auto'):
+    if name == 'auto':
+        return 'scipy' if HAS_SCIPY_FFT else 'numpy'
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown FFT backend: {name}. Use one of {list(BACKENDS)}.")
+    if name != 'numpy' and not HAS_SCIPY_FFT:
+        raise ValueError(f"FFT backend '{name}' requires scipy")
+    return name
+
+
+def next_fast_len(n):
+    if HAS_SCIPY_FFT:
+        return sp_fft.next_fast_len(n, real=True)
+    # Smallest 5-smooth number >= n
+    best = n
+    while True:
+        m = best
+        for p in (2, 3, 5):
+            while m % p == 0:
+                m //= p
+        if m == 1:
+            return best
+        best += 1
+
+
+def rfft(signal, backend='auto', n=None, workers=None):
+    # Transforms along the last axis (one row per signal for 2-D input)
+    if n is None:
+        n = signal.shape[-1]
+    return BACKENDS[resolve_backend(backend)](signal, n, workers)
+
+
+def audit_backends(signal, backends=None, repeats=5, workers=None):
+    backends = backends or available_backends()
+    N = len(signal)
+    lengths = {'native': N, 'fast_len': next_fast_len(N)}
+    reference = np.fft.rfft(np.asarray(signal, dtype=np.float64))
+    report = {'N': N, 'fast_len': lengths['fast_len'], 'results': []}
+    
+    for backend in backends:
+        for mode, n_fft in lengths.items():
+            timings = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                X = rfft(signal, backend=backend, n=n_fft, workers=workers)
+                timings.append(time.perf_counter() - start)
+            entry = {
+                'backend': backend,
+                'mode': mode,
+                'n_fft': n_fft,
+                'best_seconds': float(np.min(timings)),
+                'mean_seconds': float(np.mean(timings))
+            }
+            # Padded transforms sample a different frequency grid
+            if n_fft == N:
+                scale = np.max(np.abs(reference)) + 1e-12
+                entry['max_rel_error'] = float(np.max(np.abs(X - reference)) / scale)
+            report['results'].append(entry)
+    
+    report['results'].sort(key=lambda r: r['best_seconds'])
+    report['fastest'] = report['results'][0]
+    return report
+
+
+if __name__ == '__main__':
+    import sys
+    from signal_processor import AudioSignalProcessor
+    
+    if len(sys.argv) < 2:
+        print("Usage: python fft_backend.py <audio_file> [repeats] [workers]")
+        sys.exit(1)
+    
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    signal, sr = AudioSignalProcessor().load_wav(sys.argv[1])
+    report = audit_backends(signal, repeats=repeats, workers=workers)
+    
+    print(f"\nN = {report['N']} samples (next fast length: {report['fast_len']})")
+    print(f"{'backend':<10}{'mode':<10}{'n_fft':>10}{'best (ms)':>12}{'mean (ms)':>12}{'rel err':>12}")
+    for r in report['results']:
+        err = f"{r['max_rel_error']:.2e}" if 'max_rel_error' in r else '-'
+        print(f"{r['backend']:<10}{r['mode']:<10}{r['n_fft']:>10}"
+              f"{r['best_seconds'] * 1e3:>12.2f}{r['mean_seconds'] * 1e3:>12.2f}{err:>12}")
+    fastest = report['fastest']
+    print(f"\nFastest: {fastest['backend']} ({fastest['mode']})")
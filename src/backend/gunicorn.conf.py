@@ -0,0 +1,31 @@
+"""
+Gunicorn configuration for the Deepfake Detection API
+Feature extraction is CPU-bound, so throughput scales with worker
+processes; threads only help overlap uploads and I/O. Tune with:
+
+    DEEPFAKE_WORKERS    worker processes (default: CPU count)
+    DEEPFAKE_THREADS    threads per worker (default: 2)
+    DEEPFAKE_BIND       listen address (default: 0.0.0.0:5000)
+    DEEPFAKE_TIMEOUT    seconds before a stuck worker is restarted (default: 120)
+
+Each /predict_batch request (and each running batch job) spawns its own
+pool of DEEPFAKE_BATCH_WORKERS processes (default: 2), so at peak a server
+runs up to WORKERS x THREADS x BATCH_WORKERS extra interpreters. Keep
+BATCH_WORKERS small when WORKERS is near the CPU count; for batch-heavy
+traffic, use fewer workers and a larger BATCH_WORKERS instead.
+"""
+
+import os
+import multiprocessing
+
+bind = os.environ.get('DEEPFAKE_BIND', '0.0.0.0:5000')
+workers = int(os.environ.get('DEEPFAKE_WORKERS', multiprocessing.cpu_count()))
+threads = int(os.environ.get('DEEPFAKE_THREADS', 2))
+worker_class = 'gthread'
+timeout = int(os.environ.get('DEEPFAKE_TIMEOUT', 120))
+
+# Load wsgi:app (and the detector) once in the master before forking
+preload_app = True
+
+# One FFT/BLAS thread per worker to avoid oversubscribing the cores
+raw_env = ['OMP_NUM_THREADS=1', 'OPENBLAS_NUM_THREADS=1', 'MKL_NUM_THREADS=1']
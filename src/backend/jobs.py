@@ -0,0 +1,221 @@
+"""
+Asynchronous Job Module
+Bounded local job queue for long-running analyses: submit returns a job ID,
+worker threads run DeepfakeDetector.predict / iter_predict_batch, and job
+status, progress and results are kept in memory or in SQLite (no external
+services). Use the SQLite store when several server processes share jobs.
+"""
+
+import json
+import time
+import uuid
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+
+_JOB_FIELDS = ('id', 'kind', 'status', 'total', 'completed', 'result', 'error',
+               'created_at', 'started_at', 'finished_at')
+
+
+class QueueFullError(Exception):
+    pass
+
+
+class MemoryJobStore:
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def create(self, job):
+        with self._lock:
+            self._jobs[job['id']] = dict(job)
+            # Forget the oldest finished jobs beyond max_jobs
+            excess = len(self._jobs) - self.max_jobs
+            for job_id in list(self._jobs):
+                if excess <= 0:
+                    break
+                if self._jobs[job_id]['status'] in ('done', 'failed'):
+                    del self._jobs[job_id]
+                    excess -= 1
+
+    def update(self, job_id, **fields):
+        with self._lock:
+            if job_id in self._jobs:
+                self._jobs[job_id].update(fields)
+
+    def get(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def delete(self, job_id):
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+
+class SQLiteJobStore:
+    def __init__(self, path, max_jobs=1000):
+        self.path = path
+        self.max_jobs = max_jobs
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS jobs ("
+                "id TEXT PRIMARY KEY, kind TEXT, status TEXT, total INTEGER, "
+                "completed INTEGER, result TEXT, error TEXT, created_at REAL, "
+                "started_at REAL, finished_at REAL)"
+            )
+
+    def _connect(self):
+        # One connection per thread (sqlite3 connections are not shareable)
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            self._local.conn = conn
+        return conn
+
+    def create(self, job):
+        row = dict(job, result=json.dumps(job.get('result')))
+        with self._connect() as conn:
+            conn.execute(f"INSERT INTO jobs ({', '.join(_JOB_FIELDS)}) "
+                         f"VALUES ({', '.join('?' * len(_JOB_FIELDS))})",
+                         [row.get(field) for field in _JOB_FIELDS])
+            conn.execute(
+                "DELETE FROM jobs WHERE status IN ('done', 'failed') AND id NOT IN "
+                "(SELECT id FROM jobs ORDER BY created_at DESC LIMIT ?)", (self.max_jobs,))
+
+    def update(self, job_id, **fields):
+        if 'result' in fields:
+            fields['result'] = json.dumps(fields['result'])
+        assignments = ', '.join(f'{field} = ?' for field in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?",
+                         list(fields.values()) + [job_id])
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            f"SELECT {', '.join(_JOB_FIELDS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(zip(_JOB_FIELDS, row))
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def delete(self, job_id):
+        with self._connect() as conn:
+            conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,))
+
+
+class JobManager:
+    def __init__(self, detector, workers=2, max_queue=64, store=None, batch_workers=1,
+                 batch_executor='process', max_queued_bytes=None):
+        self.detector = detector
+        self.workers = workers
+        self.max_queued_bytes = max_queued_bytes
+        # Upload bytes held by queued and running jobs
+        self._queued_bytes = 0
+        self.batch_workers = batch_workers
+        self.batch_executor = batch_executor
+        self.store = store or MemoryJobStore()
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._threads = []
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        # Threads start on first use, so a manager created before a
+        # preforking server forks still gets live workers in each process
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._run, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def submit(self, kind, items):
+        # kind: 'predict' (one (name, source) item) or 'batch'
+        self._ensure_started()
+        job = {
+            'id': uuid.uuid4().hex,
+            'kind': kind,
+            'status': 'queued',
+            'total': len(items),
+            'completed': 0,
+            'result': None,
+            'error': None,
+            'created_at': time.time(),
+            'started_at': None,
+            'finished_at': None
+        }
+        size = sum(len(source) for _, source in items)
+        with self._lock:
+            # An oversized job is still admitted into an empty queue, so it
+            # is not rejected forever
+            if (self.max_queued_bytes is not None and self._queued_bytes
+                    and self._queued_bytes + size > self.max_queued_bytes):
+                raise QueueFullError(f'Job queue is full ({self._queued_bytes} bytes pending, '
+                                     f'max {self.max_queued_bytes})')
+            self._queued_bytes += size
+        # Recorded before queueing so workers always find the job
+        self.store.create(job)
+        try:
+            self._queue.put_nowait((job['id'], kind, items, size))
+        except queue.Full:
+            self.store.delete(job['id'])
+            self._release(size)
+            raise QueueFullError(f'Job queue is full ({self._queue.maxsize} pending jobs)')
+        return job['id']
+
+    def _release(self, size):
+        with self._lock:
+            self._queued_bytes -= size
+
+    def get(self, job_id):
+        return self.store.get(job_id)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def queued_bytes(self):
+        return self._queued_bytes
+
+    def _run(self):
+        while True:
+            job_id, kind, items, size = self._queue.get()
+            try:
+                self._execute(job_id, kind, items)
+            except Exception as e:
+                self.store.update(job_id, status='failed', error=str(e),
+                                  finished_at=time.time())
+            finally:
+                # Drop the payload before releasing its bytes
+                items = None
+                self._release(size)
+                self._queue.task_done()
+
+    def _execute(self, job_id, kind, items):
+        self.store.update(job_id, status='running', started_at=time.time())
+        if kind == 'predict':
+            name, source = items[0]
+            result = self.detector.predict(source)
+            result['filepath'] = name
+            self.store.update(job_id, status='done', completed=1, result=result,
+                              finished_at=time.time())
+            return
+
+        results = [None] * len(items)
+        completed = 0
+        # Process pools are spawned, not forked: this is one of several job
+        # threads in a (usually multithreaded) server process
+        for index, result in self.detector.iter_predict_batch(
+                [source for _, source in items], workers=self.batch_workers,
+                executor=self.batch_executor, ordered=False, start_method='spawn'):
+            result['filepath'] = items[index][0]
+            results[index] = result
+            completed += 1
+            self.store.update(job_id, completed=completed)
+        self.store.update(job_id, status='done', result=results,
+                          finished_at=time.time())
@@ -0,0 +1,178 @@
+"""
+Metrics Module
+Per-stage latency histograms, counters and in-flight gauges for the
+prediction hot path, rendered in the Prometheus text exposition format.
+Recording is off until enable() is called; while disabled, stage() returns a
+shared no-op context manager and inc() returns immediately.
+"""
+
+import time
+import threading
+
+# Histogram bucket upper bounds, in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+STAGE_METRIC = 'deepfake_stage_duration_seconds'
+IN_FLIGHT_METRIC = 'deepfake_in_flight'
+
+
+class _Stage:
+    __slots__ = ('registry', 'name', 'start')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.observe(self.name, time.perf_counter() - self.start)
+        return False
+
+
+class _InFlight:
+    __slots__ = ('registry', 'name')
+
+    def __init__(self, registry, name):
+        self.registry = registry
+        self.name = name
+
+    def __enter__(self):
+        self.registry.add_in_flight(self.name, 1)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.registry.add_in_flight(self.name, -1)
+        return False
+
+
+class _NullContext:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL = _NullContext()
+
+
+def null_stage(name):
+    # Stand-in for stage() where a code path should not be recorded
+    return _NULL
+
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in labels) + '}'
+
+
+class MetricsRegistry:
+    def __init__(self, enabled=False, buckets=DEFAULT_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self.reset()
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        with self._lock:
+            self._histograms = {}    # stage -> [bucket counts..., +Inf count], sum
+            self._counters = {}      # (name, labels) -> value
+            self._in_flight = {}     # operation -> current count
+
+    def stage(self, name):
+        # with registry.stage('fft'): ...  -> one histogram observation
+        return _Stage(self, name) if self.enabled else _NULL
+
+    def in_flight(self, name):
+        return _InFlight(self, name) if self.enabled else _NULL
+
+    def observe(self, name, seconds):
+        with self._lock:
+            histogram = self._histograms.get(name)
+            if histogram is None:
+                histogram = self._histograms[name] = [[0] * (len(self.buckets) + 1), 0.0]
+            counts = histogram[0]
+            for i, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    counts[i] += 1
+                    break
+            else:
+                counts[-1] += 1
+            histogram[1] += seconds
+
+    def inc(self, name, amount=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def add_in_flight(self, name, delta):
+        with self._lock:
+            self._in_flight[name] = self._in_flight.get(name, 0) + delta
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'stages': {name: {'count': sum(counts), 'sum': total}
+                           for name, (counts, total) in self._histograms.items()},
+                'counters': {name + _format_labels(labels): value
+                             for (name, labels), value in self._counters.items()},
+                'in_flight': dict(self._in_flight)
+            }
+
+    def render(self, gauges=(), counters=()):
+        # Prometheus text format. gauges/counters: extra (name, help, value)
+        # triples sampled at scrape time (e.g. queue depth, cache hit counts);
+        # counter names end in _total
+        lines = []
+        with self._lock:
+            lines.append(f'# HELP {STAGE_METRIC} Time spent in each processing stage')
+            lines.append(f'# TYPE {STAGE_METRIC} histogram')
+            for name in sorted(self._histograms):
+                counts, total = self._histograms[name]
+                cumulative = 0
+                for bound, count in zip(self.buckets + ('+Inf',), counts):
+                    cumulative += count
+                    lines.append(f'{STAGE_METRIC}_bucket{{stage="{name}",le="{bound}"}} {cumulative}')
+                lines.append(f'{STAGE_METRIC}_sum{{stage="{name}"}} {total}')
+                lines.append(f'{STAGE_METRIC}_count{{stage="{name}"}} {cumulative}')
+
+            lines.append(f'# HELP {IN_FLIGHT_METRIC} Operations currently running')
+            lines.append(f'# TYPE {IN_FLIGHT_METRIC} gauge')
+            for name in sorted(self._in_flight):
+                lines.append(f'{IN_FLIGHT_METRIC}{{operation="{name}"}} {self._in_flight[name]}')
+
+            seen = set()
+            for name, labels in sorted(self._counters):
+                if name not in seen:
+                    lines.append(f'# TYPE {name} counter')
+                    seen.add(name)
+                lines.append(f'{name}{_format_labels(labels)} {self._counters[(name, labels)]}')
+
+        for kind, samples in (('gauge', gauges), ('counter', counters)):
+            for name, help_text, value in samples:
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} {kind}')
+                lines.append(f'{name} {value}')
+        return '\n'.join(lines) + '\n'
+
+
+# Process-wide registry used by the processor, detector and API
+REGISTRY = MetricsRegistry()
+stage = REGISTRY.stage
+in_flight = REGISTRY.in_flight
+inc = REGISTRY.inc
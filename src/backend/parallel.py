@@ -0,0 +1,107 @@
+"""
+Parallel Execution Module
+Bounded process/thread pool mapping with ordered or as-completed results.
+"""
+
+import os
+import multiprocessing
+from itertools import islice
+from concurrent.futures import (ProcessPoolExecutor, ThreadPoolExecutor,
+                                wait, FIRST_COMPLETED)
+
+EXECUTORS = ('process', 'thread')
+
+
+def resolve_workers(workers):
+    # Same convention as scipy.fft: -1 means all cores
+    if workers is None or workers == 0:
+        return 1
+    if workers < 0:
+        return max(1, (os.cpu_count() or 1) + 1 + workers)
+    return workers
+
+
+def _run_chunk(fn, items):
+    return [fn(item) for item in items]
+
+
+def _make_executor(executor, workers, initializer, initargs, start_method=None):
+    if executor == 'process':
+        mp_context = multiprocessing.get_context(start_method) if start_method else None
+        return ProcessPoolExecutor(max_workers=workers, initializer=initializer,
+                                   initargs=initargs, mp_context=mp_context)
+    if executor == 'thread':
+        return ThreadPoolExecutor(max_workers=workers, initializer=initializer,
+                                  initargs=initargs)
+    raise ValueError(f"Unknown executor: {executor}. Use one of {EXECUTORS}.")
+
+
+def parallel_map(fn, items, workers=-1, executor='process', chunksize=1,
+                 max_in_flight=None, ordered=True, initializer=None, initargs=(),
+                 start_method=None):
+    # Yields (index, fn(item)) pairs. At most max_in_flight chunks are
+    # submitted but not yet yielded, which bounds both queued work and
+    # results buffered while waiting for an earlier index (ordered mode).
+    # With executor='process', fn and items must be picklable. items may be
+    # any iterable (e.g. a directory walk); it is consumed only as the pool
+    # needs work. start_method ('spawn', 'forkserver', 'fork'; None = the
+    # platform default) applies to process pools; use 'spawn' when the
+    # caller is one of several threads, since a forked child inherits
+    # whatever locks other threads held at fork time.
+    workers = resolve_workers(workers)
+    chunksize = max(1, chunksize)
+    if max_in_flight is None:
+        max_in_flight = 2 * workers
+    max_in_flight = max(1, max_in_flight)
+
+    def iter_chunks():
+        iterator = iter(items)
+        start = 0
+        while True:
+            chunk = list(islice(iterator, chunksize))
+            if not chunk:
+                return
+            yield start, chunk
+            start += len(chunk)
+
+    chunks = iter_chunks()
+
+    with _make_executor(executor, workers, initializer, initargs, start_method) as pool:
+        running = {}
+        done_chunks = {}
+        next_start = 0
+        pending = 0
+        exhausted = False
+
+        while True:
+            # Keep the pool fed up to the in-flight bound
+            while not exhausted and pending < max_in_flight:
+                try:
+                    start, chunk = next(chunks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                running[pool.submit(_run_chunk, fn, chunk)] = start
+                pending += 1
+
+            if not running:
+                break
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                start = running.pop(future)
+                results = future.result()
+                if ordered:
+                    done_chunks[start] = results
+                    continue
+                pending -= 1
+                for offset, result in enumerate(results):
+                    yield start + offset, result
+
+            # Release completed chunks in input order
+            while next_start in done_chunks:
+                results = done_chunks.pop(next_start)
+                pending -= 1
+                for offset, result in enumerate(results):
+                    yield next_start + offset, result
+                next_start += len(results)
@@ -0,0 +1,170 @@
+"""
+Prediction Cache Module
+Content-addressed cache of prediction results: in-memory LRU bounded by
+size, with an optional on-disk tier bounded by total file size (least
+recently used files, by mtime, are deleted first). Keys combine the SHA-256 of the
+uploaded bytes with the detector version, so a stats update never serves
+stale results.
+"""
+
+import os
+import json
+import hashlib
+import tempfile
+import threading
+from pathlib import Path
+from collections import OrderedDict
+
+
+def content_key(content, version):
+    return f"{hashlib.sha256(content).hexdigest()}-{version}"
+
+
+def file_digest(filepath, block_size=1024 * 1024):
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_content_key(filepath, version):
+    return f"{file_digest(filepath)}-{version}"
+
+
+class PredictionCache:
+    def __init__(self, max_bytes=64 * 1024 * 1024, disk_dir=None,
+                 max_disk_bytes=1024 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.max_disk_bytes = max_disk_bytes
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self._entries = OrderedDict()    # key -> (result, size)
+        self._bytes = 0
+        self._disk_bytes = 0
+        self.disk_evictions = 0
+        if self.disk_dir is not None:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+            self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def _disk_path(self, key):
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_files(self):
+        # (path, size, mtime) of the cached results; the directory may be
+        # shared with other server processes, so it is the source of truth
+        files = []
+        with os.scandir(self.disk_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith('.json'):
+                    continue
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _prune_disk(self):
+        # Delete least recently used files down to 90% of the budget, so
+        # the directory is not rescanned on every put
+        files = sorted(self._disk_files(), key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = int(self.max_disk_bytes * 0.9)
+        evicted = 0
+        for path, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+        with self._lock:
+            self._disk_bytes = total
+            self.disk_evictions += evicted
+
+    def _insert(self, key, result, size):
+        # Caller holds the lock
+        if key in self._entries:
+            self._bytes -= self._entries.pop(key)[1]
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (result, size)
+        self._bytes += size
+        while self._bytes > self.max_bytes:
+            _, (_, evicted_size) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    def get(self, key):
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return dict(self._entries[key][0])
+
+        if self.disk_dir is not None:
+            path = self._disk_path(key)
+            try:
+                payload = path.read_text()
+                result = json.loads(payload)
+                # mtime marks recent use for disk eviction
+                os.utime(path)
+            except (OSError, ValueError):
+                result = None
+            if result is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                    self._insert(key, result, len(payload))
+                return dict(result)
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, result):
+        payload = json.dumps(result)
+        with self._lock:
+            self._insert(key, dict(result), len(payload))
+
+        if self.disk_dir is not None:
+            # Atomic write so concurrent readers never see a partial file
+            fd, tmp_path = tempfile.mkstemp(dir=self.disk_dir, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                f.write(payload)
+            os.replace(tmp_path, self._disk_path(key))
+            with self._lock:
+                self._disk_bytes += len(payload)
+                over_budget = self._disk_bytes > self.max_disk_bytes
+            if over_budget:
+                self._prune_disk()
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'disk_bytes': self._disk_bytes,
+                'max_disk_bytes': self.max_disk_bytes,
+                'disk_evictions': self.disk_evictions,
+                'hit_rate': hits / lookups if lookups else 0.0,
+                'disk_tier': str(self.disk_dir) if self.disk_dir else None
+            }
@@ -7,27 +7,182 @@ The classifier decision rule: if C(x) > θ -> Human else -> AI
 import os
 import numpy as np
 from pathlib import Path
+from functools import partial
 from signal_processor import AudioSignalProcessor
+from feature_cache import FeatureCache
+from parallel import parallel_map, resolve_workers
 import json
 
+METRICS = ['phase_coherence', 'phase_velocity', 'spectral_entropy']
+LABELS = ['human', 'nonhuman']
+DEFAULT_HUMAN_DIR = '../../data/human'
+DEFAULT_NONHUMAN_DIR = '../../data/nonhuman'
+
+
+class RunningStats:
+    # Welford running moments (count, mean, M2), mergeable across shards
+    def __init__(self, count=0, mean=0.0, m2=0.0):
+        self.count = count
+        self.mean = mean
+        self.m2 = m2
+    
+    def update(self, value):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+    
+    def merge(self, other):
+        # Chan et al. pairwise combination
+        count = self.count + other.count
+        if count == 0:
+            return RunningStats()
+        delta = other.mean - self.mean
+        mean = self.mean + delta * other.count / count
+        m2 = self.m2 + other.m2 + delta ** 2 * self.count * other.count / count
+        return RunningStats(count, mean, m2)
+    
+    @property
+    def std(self):
+        # Population std, same as np.std
+        return float(np.sqrt(self.m2 / self.count)) if self.count > 0 else 0.0
+    
+    def to_dict(self):
+        return {
+            'mean': float(self.mean),
+            'std': self.std,
+            'count': self.count,
+            'm2': float(self.m2)
+        }
+    
+    @classmethod
+    def from_dict(cls, d):
+        count = d.get('count', 0)
+        # Files written before M2 was stored: recover it from std
+        m2 = d['m2'] if 'm2' in d else d.get('std', 0.0) ** 2 * count
+        return cls(count, d.get('mean', 0.0), m2)
+
+
+def merge_statistics(*stats_list):
+    # Combine reference statistics (e.g. shards from several machines)
+    # without re-reading any audio
+    modes = {stats.get('feature_mode', 'global') for stats in stats_list}
+    if len(modes) > 1:
+        raise ValueError(f"Cannot merge statistics from different feature modes: {sorted(modes)}")
+    rates = {stats.get('resample_sr') for stats in stats_list}
+    if len(rates) > 1:
+        raise ValueError(f"Cannot merge statistics computed at different sample rates: {rates}")
+    
+    result = {}
+    for label in LABELS:
+        result[label] = {}
+        for metric in METRICS:
+            total = RunningStats()
+            for stats in stats_list:
+                if metric in stats.get(label, {}):
+                    total = total.merge(RunningStats.from_dict(stats[label][metric]))
+            result[label][metric] = total.to_dict()
+    result['feature_mode'] = modes.pop()
+    result['resample_sr'] = rates.pop()
+    # Carried through when the inputs that set it agree (fresh shards and
+    # update batches have none)
+    thresholds = {stats['decision_threshold'] for stats in stats_list
+                  if 'decision_threshold' in stats}
+    if len(thresholds) > 1:
+        raise ValueError(f"Cannot merge statistics with different decision thresholds: "
+                         f"{sorted(thresholds)}")
+    if thresholds:
+        result['decision_threshold'] = thresholds.pop()
+    return result
+
+
+def print_statistics(result):
+    for label in LABELS:
+        print(f"\n{label.upper()} SPEECH (N={result[label]['phase_coherence']['count']})")
+        print(f"  Phase Coherence:")
+        print(f"    μ = {result[label]['phase_coherence']['mean']:.4f}")
+        print(f"    σ = {result[label]['phase_coherence']['std']:.4f}")
+        print(f"  Phase Velocity:")
+        print(f"    μ = {result[label]['phase_velocity']['mean']:.4f}")
+        print(f"    σ = {result[label]['phase_velocity']['std']:.4f}")
+        print(f"  Spectral Entropy:")
+        print(f"    μ = {result[label]['spectral_entropy']['mean']:.4f}")
+        print(f"    σ = {result[label]['spectral_entropy']['std']:.4f}")
+
+
+def _extract_scalar_features(processor, feature_mode, filepath):
+    # Runs in pool workers: returns (features, error) so one bad file
+    # does not abort the build
+    try:
+        features = processor.extract_features(str(filepath), mode=feature_mode, lean=True)
+        return {
+            'phase_coherence': float(features['phase_coherence']),
+            'phase_velocity': float(features['phase_velocity']),
+            'spectral_entropy': float(features['spectral_entropy'])
+        }, None
+    except Exception as e:
+        return None, str(e)
+
+
 class ReferenceStatisticsComputer:
-    def __init__(self, human_dir, nonhuman_dir):
-        self.human_dir = Path(human_dir)
-        self.nonhuman_dir = Path(nonhuman_dir)
-        self.processor = AudioSignalProcessor()
+    def __init__(self, human_dir, nonhuman_dir, feature_mode='global', resample=False):
+        # Either may be None (e.g. --update with new human files only)
+        self.human_dir = Path(human_dir) if human_dir else None
+        self.nonhuman_dir = Path(nonhuman_dir) if nonhuman_dir else None
+        self.feature_mode = feature_mode
+        self.processor = AudioSignalProcessor(resample=resample)
     
     def get_wav_files(self, directory):
         audio_files = []
-        if os.path.exists(directory):
+        if directory and os.path.exists(directory):
             audio_files = list(Path(directory).glob('**/*.wav'))
             audio_files += list(Path(directory).glob('**/*.mp3'))
         return sorted(audio_files)
     
-    def compute_statistics(self, verbose=True):
-        stats = {
-            'human': {'coherences': [], 'velocities': [], 'entropies': []},
-            'nonhuman': {'coherences': [], 'velocities': [], 'entropies': []}
-        }
+    def _process_dataset(self, files, verbose=True, workers=1, cache=None):
+        accumulators = {metric: RunningStats() for metric in METRICS}
+        settings = self.processor.feature_settings(self.feature_mode)
+        
+        # Reuse cached features for unchanged files
+        features_by_index = {}
+        todo = []
+        for index, filepath in enumerate(files):
+            cached = cache.get(filepath, settings) if cache is not None else None
+            if cached is not None:
+                features_by_index[index] = cached
+            else:
+                todo.append((index, filepath))
+        if verbose and cache is not None:
+            print(f"{len(features_by_index)} cached, {len(todo)} to process\n")
+        
+        fn = partial(_extract_scalar_features, self.processor, self.feature_mode)
+        todo_files = [filepath for _, filepath in todo]
+        if resolve_workers(workers) == 1:
+            results = ((i, fn(filepath)) for i, filepath in enumerate(todo_files))
+        else:
+            results = parallel_map(fn, todo_files, workers=workers, ordered=False)
+        
+        for i, (features, error) in results:
+            index, filepath = todo[i]
+            if error is not None:
+                if verbose:
+                    print(f"Processing: {filepath.name} → ERROR: {error}")
+                continue
+            # Flushed immediately so an interrupted build can resume
+            if cache is not None:
+                cache.put(filepath, settings, features)
+            features_by_index[index] = features
+            if verbose:
+                print(f"Processing: {filepath.name} → Coherence: {features['phase_coherence']:.4f}")
+        
+        for index in sorted(features_by_index):
+            for metric in METRICS:
+                accumulators[metric].update(features_by_index[index][metric])
+        return accumulators
+    
+    def compute_statistics(self, verbose=True, workers=1, cache_file=None):
+        cache = FeatureCache(cache_file) if cache_file else None
+        stats = {}
         # Process human speech
         if verbose:
             print("=" * 70)
@@ -36,19 +191,7 @@ class ReferenceStatisticsComputer:
         human_files = self.get_wav_files(self.human_dir)
         if verbose:
             print(f"Found {len(human_files)} human speech files\n")
-        for filepath in human_files:
-            try:
-                if verbose:
-                    print(f"Processing: {filepath.name}", end=" → ")
-                features = self.processor.extract_all_features(str(filepath))
-                stats['human']['coherences'].append(features['phase_coherence'])
-                stats['human']['velocities'].append(features['phase_velocity'])
-                stats['human']['entropies'].append(features['spectral_entropy'])
-                if verbose:
-                    print(f"Coherence: {features['phase_coherence']:.4f}")
-            except Exception as e:
-                if verbose:
-                    print(f"ERROR: {str(e)}")
+        stats['human'] = self._process_dataset(human_files, verbose, workers, cache)
         
         # Process AI-generated speech
         if verbose:
@@ -58,19 +201,7 @@ class ReferenceStatisticsComputer:
         nonhuman_files = self.get_wav_files(self.nonhuman_dir)
         if verbose:
             print(f"Found {len(nonhuman_files)} AI-generated speech files\n")
-        for filepath in nonhuman_files:
-            try:
-                if verbose:
-                    print(f"Processing: {filepath.name}", end=" → ")
-                features = self.processor.extract_all_features(str(filepath))
-                stats['nonhuman']['coherences'].append(features['phase_coherence'])
-                stats['nonhuman']['velocities'].append(features['phase_velocity'])
-                stats['nonhuman']['entropies'].append(features['spectral_entropy'])
-                if verbose:
-                    print(f"Coherence: {features['phase_coherence']:.4f}")
-            except Exception as e:
-                if verbose:
-                    print(f"ERROR: {str(e)}")
+        stats['nonhuman'] = self._process_dataset(nonhuman_files, verbose, workers, cache)
         
         # Compute aggregate statistics
         if verbose:
@@ -78,45 +209,31 @@ class ReferenceStatisticsComputer:
             print("COMPUTED STATISTICS")
             print("=" * 70)
         
-        result = {}
+        result = {
+            label: {metric: acc.to_dict() for metric, acc in stats[label].items()}
+            for label in LABELS
+        }
+        result['feature_mode'] = self.feature_mode
+        result['resample_sr'] = self.processor.target_sr if self.processor.resample else None
         
-        for label in ['human', 'nonhuman']:
-            coherences = np.array(stats[label]['coherences'])
-            velocities = np.array(stats[label]['velocities'])
-            entropies = np.array(stats[label]['entropies'])
-            
-            result[label] = {
-                'phase_coherence': {
-                    'mean': float(np.mean(coherences)) if len(coherences) > 0 else 0.0,
-                    'std': float(np.std(coherences)) if len(coherences) > 0 else 0.0,
-                    'count': len(coherences)
-                },
-                'phase_velocity': {
-                    'mean': float(np.mean(velocities)) if len(velocities) > 0 else 0.0,
-                    'std': float(np.std(velocities)) if len(velocities) > 0 else 0.0,
-                    'count': len(velocities)
-                },
-                'spectral_entropy': {
-                    'mean': float(np.mean(entropies)) if len(entropies) > 0 else 0.0,
-                    'std': float(np.std(entropies)) if len(entropies) > 0 else 0.0,
-                    'count': len(entropies)
-                }
-            }
-            
-            if verbose:
-                print(f"\n{label.upper()} SPEECH (N={len(coherences)})")
-                print(f"  Phase Coherence:")
-                print(f"    μ = {result[label]['phase_coherence']['mean']:.4f}")
-                print(f"    σ = {result[label]['phase_coherence']['std']:.4f}")
-                print(f"  Phase Velocity:")
-                print(f"    μ = {result[label]['phase_velocity']['mean']:.4f}")
-                print(f"    σ = {result[label]['phase_velocity']['std']:.4f}")
-                print(f"  Spectral Entropy:")
-                print(f"    μ = {result[label]['spectral_entropy']['mean']:.4f}")
-                print(f"    σ = {result[label]['spectral_entropy']['std']:.4f}")
+        if verbose:
+            print_statistics(result)
         
         return result
     
+    def update_statistics(self, stats, verbose=True, workers=1, cache_file=None):
+        # Fold the (new) labelled files under human_dir/nonhuman_dir into
+        # existing statistics; files already counted must not be passed again
+        if stats.get('feature_mode', 'global') != self.feature_mode:
+            raise ValueError("Existing statistics were computed in a different feature mode")
+        if stats.get('resample_sr') != (self.processor.target_sr if self.processor.resample else None):
+            raise ValueError("Existing statistics were computed at a different sample rate")
+        new_stats = self.compute_statistics(verbose=False, workers=workers, cache_file=cache_file)
+        result = merge_statistics(stats, new_stats)
+        if verbose:
+            print_statistics(result)
+        return result
+    
     def save_statistics(self, stats, filepath='reference_stats.json'):
         with open(filepath, 'w') as f:
             json.dump(stats, f, indent=2)
@@ -127,14 +244,107 @@ class ReferenceStatisticsComputer:
             return json.load(f)
 
 
-def compute_and_save_reference_stats(human_dir='../../data/human', 
-                                      nonhuman_dir='../../data/nonhuman',
-                                      output_file='reference_stats.json'):
-    computer = ReferenceStatisticsComputer(human_dir, nonhuman_dir)
-    stats = computer.compute_statistics(verbose=True)
+def resample_consistency_report(files, stats, target_sr=16000, verbose=True):
+    # Feature drift caused by decode-time resampling, in units of the
+    # reference class standard deviation. Drift well below 1σ means the
+    # native-rate statistics still apply; otherwise rebuild them with --resample.
+    native = AudioSignalProcessor()
+    resampled = AudioSignalProcessor(target_sr=target_sr, resample=True)
+    drifts = {metric: [] for metric in METRICS}
+    
+    for filepath in files:
+        try:
+            a = native.extract_all_features(str(filepath))
+            b = resampled.extract_all_features(str(filepath))
+        except Exception as e:
+            if verbose:
+                print(f"{Path(filepath).name}: ERROR: {str(e)}")
+            continue
+        for metric in METRICS:
+            sigma = (stats['human'][metric]['std'] + stats['nonhuman'][metric]['std']) / 2
+            drifts[metric].append(abs(float(b[metric]) - float(a[metric])) / (sigma + 1e-12))
+    
+    report = {
+        metric: {
+            'mean_drift_sigma': float(np.mean(values)) if values else 0.0,
+            'max_drift_sigma': float(np.max(values)) if values else 0.0,
+            'count': len(values)
+        }
+        for metric, values in drifts.items()
+    }
+    report['target_sr'] = target_sr
+    
+    if verbose:
+        print(f"\nResampling to {target_sr} Hz, drift vs. reference σ:")
+        for metric in METRICS:
+            print(f"  {metric:<18} mean {report[metric]['mean_drift_sigma']:.3f}σ"
+                  f"  max {report[metric]['max_drift_sigma']:.3f}σ")
+    return report
+
+
+def compute_and_save_reference_stats(human_dir=DEFAULT_HUMAN_DIR,
+                                      nonhuman_dir=DEFAULT_NONHUMAN_DIR,
+                                      output_file='reference_stats.json',
+                                      feature_mode='global',
+                                      workers=1,
+                                      cache_file=None,
+                                      resample=False):
+    computer = ReferenceStatisticsComputer(human_dir, nonhuman_dir, feature_mode=feature_mode,
+                                           resample=resample)
+    stats = computer.compute_statistics(verbose=True, workers=workers, cache_file=cache_file)
     computer.save_statistics(stats, output_file)
     return stats
 
 
 if __name__ == '__main__':
-    compute_and_save_reference_stats()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Compute reference statistics')
+    parser.add_argument('--human-dir', help=f'Default: {DEFAULT_HUMAN_DIR} (no default with --update)')
+    parser.add_argument('--nonhuman-dir',
+                       help=f'Default: {DEFAULT_NONHUMAN_DIR} (no default with --update)')
+    parser.add_argument('--output', default='reference_stats.json')
+    parser.add_argument('--feature-mode', choices=['global', 'framed'], default='global',
+                       help='Single whole-signal FFT or framed STFT features')
+    parser.add_argument('--workers', type=int, default=-1,
+                       help='Feature extraction processes (-1 = all cores)')
+    parser.add_argument('--cache', default='feature_cache.jsonl',
+                       help='Per-file feature cache for incremental/resumable builds')
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--update', metavar='STATS_FILE',
+                       help='Fold the files in --human-dir/--nonhuman-dir into existing statistics')
+    parser.add_argument('--merge', nargs='+', metavar='STATS_FILE',
+                       help='Merge statistics files (shards) into --output without reading audio')
+    parser.add_argument('--resample', action='store_true',
+                       help='Resample all audio to 16 kHz at decode time')
+    parser.add_argument('--check-resample', metavar='DIR',
+                       help='Report feature drift from resampling the files in DIR')
+    args = parser.parse_args()
+    cache_file = None if args.no_cache else args.cache
+    
+    if args.check_resample:
+        computer = ReferenceStatisticsComputer(args.human_dir, args.nonhuman_dir)
+        resample_consistency_report(computer.get_wav_files(args.check_resample),
+                                    computer.load_statistics(args.output))
+    elif args.merge:
+        computer = ReferenceStatisticsComputer(args.human_dir, args.nonhuman_dir)
+        merged = merge_statistics(*[computer.load_statistics(f) for f in args.merge])
+        print_statistics(merged)
+        computer.save_statistics(merged, args.output)
+    elif args.update:
+        # Only new files: the default dirs are what the stats were built
+        # from, and folding them in again would count every clip twice
+        if not (args.human_dir or args.nonhuman_dir):
+            parser.error('--update needs --human-dir and/or --nonhuman-dir with the new files only')
+        computer = ReferenceStatisticsComputer(args.human_dir, args.nonhuman_dir,
+                                               feature_mode=args.feature_mode,
+                                               resample=args.resample)
+        updated = computer.update_statistics(computer.load_statistics(args.update),
+                                             workers=args.workers, cache_file=cache_file)
+        computer.save_statistics(updated, args.output)
+    else:
+        compute_and_save_reference_stats(args.human_dir or DEFAULT_HUMAN_DIR,
+                                         args.nonhuman_dir or DEFAULT_NONHUMAN_DIR,
+                                         args.output, args.feature_mode,
+                                         workers=args.workers, cache_file=cache_file,
+                                         resample=args.resample)
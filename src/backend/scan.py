@@ -0,0 +1,372 @@
+#!/usr/bin/env python3
+"""
+Bulk Scan Module
+Scores every audio file under a directory (or listed in a manifest) with
+DeepfakeDetector in a bounded worker pool, writing one row per file to
+numbered CSV or Parquet chunks (failed files go to separate error chunks).
+Chunks are written atomically; on restart the files already present in
+finished chunks are skipped, so an interrupted scan resumes where it
+stopped, and --retry-errors rescores the failed ones. Throughput is reported
+while it runs.
+
+    python scan.py /data/calls --output scan_results
+    python scan.py manifest.csv --output scan_results --format parquet --workers 8
+    python scan.py /data/calls --output scan_results --retry-errors
+"""
+
+import os
+import csv
+import sys
+import json
+import time
+import hashlib
+import argparse
+from functools import partial
+
+import numpy as np
+
+from detector import DeepfakeDetector
+from signal_processor import AudioSignalProcessor, PRECISIONS
+from parallel import parallel_map, EXECUTORS
+
+AUDIO_EXTENSIONS = ('.wav', '.mp3')
+OUTPUT_FORMATS = ('csv', 'parquet')
+STATE_FILE = 'scan.json'
+PART_PREFIX = 'part-'
+ERROR_PREFIX = 'errors-'
+
+# Output columns (one row per input file; failed files only carry filepath and error)
+RESULT_COLUMNS = {
+    'filepath': 'string',
+    'prediction': 'string',
+    'confidence': 'float64',
+    'distance_to_human': 'float64',
+    'distance_to_ai': 'float64',
+    'phase_coherence': 'float64',
+    'phase_velocity': 'float64',
+    'spectral_entropy': 'float64',
+    'spectral_l2_norm': 'float64',
+    'duration_seconds': 'float64',
+    'error': 'string'
+}
+SCORE_COLUMNS = ('prediction', 'confidence', 'distance_to_human', 'distance_to_ai',
+                 'phase_coherence', 'phase_velocity', 'spectral_entropy', 'spectral_l2_norm')
+
+
+def _parquet():
+    # pyarrow is only needed for --format parquet
+    try:
+        import pyarrow
+        import pyarrow.parquet
+        return pyarrow
+    except ImportError:
+        raise ValueError("Parquet output requires pyarrow (pip install pyarrow); "
+                         "use --format csv")
+
+
+def iter_directory(root):
+    # Audio files under root, depth first in sorted order, without listing
+    # the whole tree up front
+    entries = sorted(os.scandir(root), key=lambda entry: entry.name)
+    for entry in entries:
+        if entry.is_dir(follow_symlinks=False):
+            yield from iter_directory(entry.path)
+        elif entry.name.lower().endswith(AUDIO_EXTENSIONS):
+            yield entry.path
+
+
+def iter_manifest(manifest):
+    # One path per line ('#' comments allowed), or a CSV file with a
+    # 'filepath' or 'path' column. Relative paths are relative to the manifest.
+    base = os.path.dirname(os.path.abspath(manifest))
+    with open(manifest, 'r', newline='') as f:
+        if manifest.lower().endswith('.csv'):
+            reader = csv.DictReader(f)
+            column = next((name for name in ('filepath', 'path')
+                           if name in (reader.fieldnames or [])), None)
+            if column is None:
+                raise ValueError(f"Manifest {manifest} has no 'filepath' or 'path' column")
+            paths = (row[column] for row in reader)
+        else:
+            paths = (line.strip() for line in f)
+        for path in paths:
+            if path and not path.startswith('#'):
+                yield os.path.join(base, path)
+
+
+def iter_inputs(source):
+    if os.path.isdir(source):
+        return iter_directory(source)
+    if os.path.isfile(source):
+        return iter_manifest(source)
+    raise FileNotFoundError(f"Input not found: {source}")
+
+
+def path_key(path):
+    # 64-bit key of the absolute path (completed files are kept as a sorted
+    # uint64 array: 8 bytes per file instead of a set of strings)
+    digest = hashlib.blake2b(os.path.abspath(path).encode('utf-8'), digest_size=8).digest()
+    return int.from_bytes(digest, 'little')
+
+
+def scan_file(detector, filepath):
+    # One result row; any failure becomes a row with an error message
+    row = dict.fromkeys(RESULT_COLUMNS)
+    row['filepath'] = os.path.abspath(filepath)
+    try:
+        features = detector.processor.extract_features(filepath, mode=detector.feature_mode,
+                                                       lean=True)
+        result = detector.score_features(features)
+        row.update({name: result[name] for name in SCORE_COLUMNS})
+        row['duration_seconds'] = features['n_samples'] / features['sr']
+    except Exception as e:
+        row['error'] = str(e)
+    return row
+
+
+# Per-process detector used by process-pool workers
+_worker_detector = None
+
+
+def _init_worker(detector):
+    global _worker_detector
+    _worker_detector = detector
+
+
+def _worker_scan(filepath):
+    return scan_file(_worker_detector, filepath)
+
+
+class ScanOutput:
+    # Numbered result chunks, error chunks (same columns, one row per failed
+    # attempt) and a small JSON state file in one directory. A chunk only
+    # appears under its final name once fully written.
+    def __init__(self, directory, fmt='csv', chunk_rows=10000):
+        if fmt not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format: {fmt}. Use one of {OUTPUT_FORMATS}.")
+        if fmt == 'parquet':
+            _parquet()
+        self.directory = directory
+        self.format = fmt
+        self.chunk_rows = chunk_rows
+        self.rows = []
+        self.error_rows = []
+        os.makedirs(directory, exist_ok=True)
+        for name in os.listdir(directory):
+            # Chunks left half-written by a crash
+            if name.startswith((PART_PREFIX, ERROR_PREFIX)) and name.endswith('.tmp'):
+                os.remove(os.path.join(directory, name))
+        self.parts = self._existing_parts(PART_PREFIX)
+        self.error_parts = self._existing_parts(ERROR_PREFIX)
+        # Result and error chunks written by one flush share a number
+        self.next_part = max((int(name.split('-')[1].split('.')[0])
+                              for name in self.parts + self.error_parts), default=-1) + 1
+        self.state = self._load_state()
+
+    def _existing_parts(self, prefix):
+        other = [f for f in OUTPUT_FORMATS if f != self.format]
+        names = sorted(name for name in os.listdir(self.directory) if name.startswith(prefix))
+        for name in names:
+            if any(name.endswith('.' + f) for f in other):
+                raise ValueError(f"{self.directory} holds {name}; resume with the same --format")
+        return [name for name in names if name.endswith('.' + self.format)]
+
+    def _load_state(self):
+        path = os.path.join(self.directory, STATE_FILE)
+        if not os.path.exists(path):
+            return {'files': 0, 'errors': 0, 'audio_seconds': 0.0, 'elapsed_seconds': 0.0}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def save_state(self, **updates):
+        self.state.update(updates)
+        path = os.path.join(self.directory, STATE_FILE)
+        with open(path + '.tmp', 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(path + '.tmp', path)
+
+    def _read_filepaths(self, name, errors=True):
+        # Filepaths in a chunk; errors=False skips rows that carry an error
+        # (result chunks written before error chunks existed hold them too)
+        path = os.path.join(self.directory, name)
+        if self.format == 'parquet':
+            pyarrow = _parquet()
+            table = pyarrow.parquet.read_table(path, columns=['filepath', 'error'])
+            rows = zip(table.column(0).to_pylist(), table.column(1).to_pylist())
+            return [filepath for filepath, error in rows if errors or not error]
+        with open(path, 'r', newline='') as f:
+            return [row['filepath'] for row in csv.DictReader(f) if errors or not row['error']]
+
+    def completed_keys(self, include_errors=True):
+        # Sorted uint64 keys of every file in the finished chunks; without
+        # include_errors, failed files count as not done
+        names = self.parts + self.error_parts if include_errors else self.parts
+        keys = [path_key(filepath) for name in names
+                for filepath in self._read_filepaths(name, errors=include_errors)]
+        return np.unique(np.array(keys, dtype=np.uint64))
+
+    def add(self, row):
+        # Returns the chunk names when this row filled a chunk
+        if row['error'] is not None:
+            self.error_rows.append(row)
+        else:
+            self.rows.append(row)
+        if len(self.rows) + len(self.error_rows) >= self.chunk_rows:
+            return self.flush()
+        return None
+
+    def _write_chunk(self, prefix, rows):
+        name = f"{prefix}{self.next_part:06d}.{self.format}"
+        path = os.path.join(self.directory, name)
+        if self.format == 'parquet':
+            pyarrow = _parquet()
+            schema = pyarrow.schema([(column, getattr(pyarrow, kind)())
+                                     for column, kind in RESULT_COLUMNS.items()])
+            table = pyarrow.Table.from_pylist(rows, schema=schema)
+            pyarrow.parquet.write_table(table, path + '.tmp')
+        else:
+            with open(path + '.tmp', 'w', newline='') as f:
+                writer = csv.DictWriter(f, fieldnames=list(RESULT_COLUMNS))
+                writer.writeheader()
+                writer.writerows(rows)
+        os.replace(path + '.tmp', path)
+        return name
+
+    def flush(self):
+        if not self.rows and not self.error_rows:
+            return None
+        names = []
+        if self.rows:
+            names.append(self._write_chunk(PART_PREFIX, self.rows))
+            self.parts.append(names[-1])
+        if self.error_rows:
+            names.append(self._write_chunk(ERROR_PREFIX, self.error_rows))
+            self.error_parts.append(names[-1])
+        self.next_part += 1
+        self.rows = []
+        self.error_rows = []
+        return names
+
+
+def _is_completed(completed, path):
+    if not len(completed):
+        return False
+    key = np.uint64(path_key(path))
+    index = np.searchsorted(completed, key)
+    return index < len(completed) and completed[index] == key
+
+
+def scan(source, detector, output, workers=-1, executor='process', chunksize=16,
+         flush_seconds=60.0, progress_seconds=10.0, retry_errors=False, verbose=True):
+    # Scores the files of source not yet in output (or that failed, with
+    # retry_errors); returns this run's totals
+    settings = {
+        'input': os.path.abspath(source),
+        'detector_version': detector.version,
+        'feature_mode': detector.feature_mode
+    }
+    previous = {name: output.state.get(name) for name in settings}
+    if output.parts and previous['detector_version'] not in (None, detector.version):
+        raise ValueError(f"{output.directory} holds results from detector version "
+                         f"{previous['detector_version']} (now {detector.version}); "
+                         "scan into a new --output directory")
+
+    completed = output.completed_keys(include_errors=not retry_errors)
+    if verbose and len(completed):
+        print(f"Resuming: {len(completed)} files already done in "
+              f"{len(output.parts) + len(output.error_parts)} chunks")
+    output.save_state(**settings)
+
+    pending = (path for path in iter_inputs(source) if not _is_completed(completed, path))
+    if executor == 'process':
+        # Each worker process gets the detector once, not with every chunk
+        fn, initializer, initargs = _worker_scan, _init_worker, (detector,)
+    else:
+        fn, initializer, initargs = partial(scan_file, detector), None, ()
+    results = parallel_map(fn, pending, workers=workers, executor=executor,
+                           chunksize=chunksize, ordered=False, initializer=initializer,
+                           initargs=initargs)
+
+    totals = {'files': 0, 'errors': 0, 'audio_seconds': 0.0}
+    start = last_flush = last_report = time.perf_counter()
+
+    def report(final=False):
+        elapsed = time.perf_counter() - start
+        rate = totals['files'] / elapsed if elapsed else 0.0
+        audio_rate = totals['audio_seconds'] / elapsed if elapsed else 0.0
+        label = 'Done' if final else 'Progress'
+        print(f"{label}: {totals['files']} files ({totals['errors']} errors) in {elapsed:.1f} s, "
+              f"{rate:.1f} files/s, {audio_rate:.1f} audio-s/s")
+
+    def checkpoint():
+        output.flush()
+        output.save_state(files=state_files + totals['files'],
+                          errors=state_errors + totals['errors'],
+                          audio_seconds=state_audio + totals['audio_seconds'],
+                          elapsed_seconds=state_elapsed + time.perf_counter() - start)
+
+    state_files, state_errors = output.state['files'], output.state['errors']
+    state_audio, state_elapsed = output.state['audio_seconds'], output.state['elapsed_seconds']
+    for _, row in results:
+        totals['files'] += 1
+        if row['error'] is not None:
+            totals['errors'] += 1
+        else:
+            totals['audio_seconds'] += row['duration_seconds']
+        if output.add(row):
+            # add() just wrote a full chunk
+            checkpoint()
+            last_flush = time.perf_counter()
+        now = time.perf_counter()
+        if now - last_flush >= flush_seconds:
+            # Bounds the work lost to a crash when files arrive slowly
+            checkpoint()
+            last_flush = now
+        if verbose and now - last_report >= progress_seconds:
+            report()
+            last_report = now
+    checkpoint()
+
+    totals['seconds'] = time.perf_counter() - start
+    if verbose:
+        report(final=True)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Score a directory or manifest of audio files')
+    parser.add_argument('input', help='Directory to scan, or a manifest (.txt: one path per '
+                                      "line; .csv: 'filepath' or 'path' column)")
+    parser.add_argument('--output', required=True, help='Results directory (resumed if it exists)')
+    parser.add_argument('--format', choices=OUTPUT_FORMATS, default='csv')
+    parser.add_argument('--chunk-rows', type=int, default=10000, help='Rows per output chunk')
+    parser.add_argument('--flush-seconds', type=float, default=60.0,
+                        help='Write a partial chunk after this long (bounds rework after a crash)')
+    parser.add_argument('--progress-seconds', type=float, default=10.0)
+    parser.add_argument('--stats', default='reference_stats.json')
+    parser.add_argument('--feature-mode', choices=['global', 'framed'], default='global')
+    parser.add_argument('--precision', choices=list(PRECISIONS), default='double')
+    parser.add_argument('--resample', action='store_true',
+                        help='Resample all audio to 16 kHz at decode time')
+    parser.add_argument('--workers', type=int, default=-1, help='-1 = all cores')
+    parser.add_argument('--executor', choices=EXECUTORS, default='process')
+    parser.add_argument('--chunksize', type=int, default=16, help='Files per worker task')
+    parser.add_argument('--retry-errors', action='store_true',
+                        help='Rescore files that failed in earlier runs')
+    args = parser.parse_args()
+
+    try:
+        processor = AudioSignalProcessor(resample=args.resample, precision=args.precision)
+        detector = DeepfakeDetector(args.stats, feature_mode=args.feature_mode,
+                                    processor=processor)
+        output = ScanOutput(args.output, args.format, args.chunk_rows)
+        scan(args.input, detector, output, workers=args.workers, executor=args.executor,
+             chunksize=args.chunksize, flush_seconds=args.flush_seconds,
+             progress_seconds=args.progress_seconds, retry_errors=args.retry_errors)
+    except (ValueError, FileNotFoundError) as e:
+        print(f"[ERROR] {e}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
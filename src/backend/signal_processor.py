@@ -1,121 +1,252 @@
 """
 Signal Processing Module for Audio Deepfake Detection
-NOTE: Uses optimized scipy FFT for performance.
+NOTE: Uses real-input FFT backends (see fft_backend.py) for performance.
 """
 
+import threading
 import numpy as np
-from scipy.io import wavfile
-from scipy.fftpack import fft
+from fft_backend import rfft, next_fast_len, resolve_backend
+from audio_io import load_audio, iter_wav_chunks, open_segments, sniff_format, DEFAULT_CHUNK_SIZE
+from workspace import Workspace, DEFAULT_WORKSPACE_BYTES
 import warnings
-from pathlib import Path
+import metrics
 
 warnings.filterwarnings('ignore')
 
-# Importing librosa
-try:
-    import librosa
-    HAS_LIBROSA = True
-except ImportError:
-    HAS_LIBROSA = False
+FEATURE_MODES = ('global', 'framed')
 
-# Importing pydub
-try:
-    from pydub import AudioSegment
-    HAS_PYDUB = True
-except ImportError:
-    HAS_PYDUB = False
+# Scalar features computed by the lean path (and used for scoring)
+SCALAR_FEATURES = ('phase_coherence', 'phase_velocity', 'spectral_entropy', 'spectral_l2_norm')
+# Frequency bins per block for the lean path's coherence/velocity reductions
+LEAN_BLOCK_SIZE = 65536
+
+# Transform/spectrum precision -> real dtype (complex spectra follow it:
+# float32 -> complex64). Reductions accumulate in float64 either way.
+PRECISIONS = {
+    'double': np.dtype(np.float64),
+    'single': np.dtype(np.float32)
+}
+
+# One row per clip from extract_batch_features (NaN features on failure)
+BATCH_FEATURE_DTYPE = np.dtype([
+    ('phase_coherence', 'f8'),
+    ('phase_velocity', 'f8'),
+    ('spectral_entropy', 'f8'),
+    ('spectral_l2_norm', 'f8'),
+    ('sr', 'i8'),
+    ('n_samples', 'i8')
+])
+
+
+def _l2_norm(magnitude):
+    # Norm along the last axis. float32 BLAS dot products accumulate in
+    # float32, so single-precision spectra are squared and summed in float64
+    if magnitude.dtype == np.float64:
+        return np.linalg.norm(magnitude, axis=-1)
+    return np.sqrt(np.einsum('...i,...i->...', magnitude, magnitude, dtype=np.float64))
 
 
 class AudioSignalProcessor:
-    def __init__(self, target_sr=16000):
+    def __init__(self, target_sr=16000, fft_backend='auto', fft_workers=None,
+                 pad_to_fast_len=False, frame_size=8192, hop_size=4096,
+                 frame_window='hann', resample=False, precision='double',
+                 workspace_bytes=DEFAULT_WORKSPACE_BYTES):
         self.target_sr = target_sr
+        # Resample every input to target_sr at decode time (smaller FFTs;
+        # needs reference statistics built with the same setting)
+        self.resample = resample
+        self.fft_backend = resolve_backend(fft_backend)
+        self.fft_workers = fft_workers
+        # Zero-pad to the next 2/3/5-smooth length (faster on awkward N)
+        self.pad_to_fast_len = pad_to_fast_len
+        # Framed (STFT) mode settings, in samples
+        if hop_size <= 0 or hop_size > frame_size:
+            raise ValueError("hop_size must be in (0, frame_size]")
+        self.frame_size = frame_size
+        self.hop_size = hop_size
+        self.frame_window = frame_window
+        # 'single' runs the FFT and spectra in float32/complex64 (half the
+        # memory traffic; see `benchmark.py precision` for the feature drift)
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}. Use one of {list(PRECISIONS)}.")
+        self.precision = precision
+        self.dtype = PRECISIONS[precision]
+        # Scratch buffers and frequency axes reused across calls, one
+        # workspace per thread (0 disables caching)
+        self.workspace_bytes = workspace_bytes
+        self._local = threading.local()
+    
+    def __getstate__(self):
+        # Workspaces stay behind when the processor is sent to a worker process
+        state = self.__dict__.copy()
+        del state['_local']
+        return state
+    
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._local = threading.local()
+    
+    @property
+    def workspace(self):
+        workspace = getattr(self._local, 'workspace', None)
+        if workspace is None:
+            workspace = self._local.workspace = Workspace(self.workspace_bytes)
+        return workspace
     
-    def load_wav(self, filepath):
+    def feature_settings(self, mode='global'):
+        # Settings that change extracted feature values (used as cache keys)
+        settings = {
+            'feature_mode': mode,
+            'target_sr': self.target_sr,
+            'resample': self.resample,
+            'pad_to_fast_len': self.pad_to_fast_len,
+            'frame_size': self.frame_size,
+            'hop_size': self.hop_size,
+            'frame_window': self.frame_window
+        }
+        # Only listed when not the default, so existing caches, feature
+        # stores and detector versions stay valid
+        if self.precision != 'double':
+            settings['precision'] = self.precision
+        if mode == 'framed':
+            # Framed features cached before entropy normalization are stale
+            settings['frame_entropy'] = 'normalized'
+        return settings
+    
+    def load_wav(self, source):
+        # source: file path, bytes-like buffer or file-like object.
+        # WAV: memory-mapped (or in-place buffer) read, downmixed to mono and
+        # normalized to [-1, 1]; MP3: soundfile, falling back to librosa
         try:
-            filepath = Path(filepath)
-            file_ext = filepath.suffix.lower()            
-            # Load MP3 files with librosa
-            if file_ext == '.mp3':
-                if not HAS_LIBROSA:
-                    raise ValueError("librosa not installed")
-                signal, sr = librosa.load(str(filepath), sr=None, mono=True)
-                return signal, sr
-            # Load WAV files
-            elif file_ext == '.wav':
-                sr, signal = wavfile.read(filepath)
-                # Convert stereo to mono if needed
-                if len(signal.shape) > 1:
-                    signal = np.mean(signal, axis=1)
-                # Normalize to [-1, 1]
-                if signal.dtype in [np.int16, np.int32]:
-                    signal = signal.astype(np.float32) / np.max(np.abs(signal))
-                else:
-                    signal = signal.astype(np.float32)
-                return signal, sr
-            else:
-                raise ValueError(f"Unsupported file format: {file_ext}. Use WAV or MP3.")
+            return load_audio(source, self.target_sr if self.resample else None)
+        except Exception as e:
+            raise ValueError(f"Error loading audio file: {str(e)}")
+    
+    def iter_chunks(self, source, chunk_size=DEFAULT_CHUNK_SIZE):
+        # (sr, generator of mono float32 chunks). WAV is streamed from a
+        # memory map or buffer; other formats (and resampled input) are
+        # decoded first and then sliced.
+        try:
+            if sniff_format(source) == 'wav' and not self.resample:
+                return iter_wav_chunks(source, chunk_size=chunk_size, mmap=True)
         except Exception as e:
             raise ValueError(f"Error loading audio file: {str(e)}")
+        signal, sr = self.load_wav(source)
+        return sr, (signal[i:i + chunk_size] for i in range(0, len(signal), chunk_size))
+    
+    def open_segments(self, source):
+        # (sr, n_samples, read(start, stop)) without decoding the whole WAV
+        try:
+            return open_segments(source, self.target_sr if self.resample else None)
+        except Exception as e:
+            raise ValueError(f"Error loading audio file: {str(e)}")
+    
+    def _rfft(self, signal, n_fft):
+        # Real-input FFT at the configured precision; 1-D casts go through a
+        # workspace buffer
+        signal = np.asarray(signal)
+        if signal.dtype != self.dtype:
+            if signal.ndim == 1:
+                cast = self.workspace.buffer('fft_input', len(signal), self.dtype)
+                np.copyto(cast, signal)
+                signal = cast
+            else:
+                signal = signal.astype(self.dtype)
+        return rfft(signal, backend=self.fft_backend, n=n_fft, workers=self.fft_workers)
     
     def compute_spectral_features(self, signal, sr=None):
-        # Apply FFT
-        X = fft(signal)
-        # Keep only positive frequencies
-        N = len(X)
-        X = X[:N//2]
+        N = len(signal)
+        n_fft = next_fast_len(N) if self.pad_to_fast_len else N
+        # Apply real-input FFT
+        X = self._rfft(signal, n_fft)
+        # Keep only positive frequencies (same bins as the full transform)
+        X = X[:n_fft//2]
         # Compute magnitude and phase in polar form
         magnitude = np.abs(X) 
         phase = np.angle(X) 
         # Frequency bins (in Hz)
         if sr is None:
             sr = self.target_sr
-        freq = np.fft.fftfreq(N, d=1/sr)[:N//2]
+        # (cached per workspace and read-only)
+        freq = self.workspace.freq(n_fft, sr)
         return {
             'X': X,                         # Complex spectral vector
             'magnitude': magnitude,         # Energy spectrum
             'phase': phase,                 # Phase spectrum
             'freq': freq,                   # Frequency axis
-            'N': N                          # Original signal length
+            'N': N,                         # Original signal length
+            'n_fft': n_fft                  # Transform length (N unless padded)
         }
     
+    def _window_sums(self, phasors, window_size, workspace=None):
+        # Sum of every window_size consecutive phasors along the last axis,
+        # vectorized. Small windows use a strided view (exact, no
+        # accumulation drift); large windows use a cumulative sum so cost
+        # stays O(N). The cumulative sum is complex128 at either precision: a
+        # complex64 running total would swamp the window differences.
+        # With a workspace (1-D only) the result is a scratch buffer.
+        n_windows = phasors.shape[-1] - window_size
+        if workspace is not None and phasors.ndim != 1:
+            workspace = None
+        if window_size <= 16:
+            windows = np.lib.stride_tricks.sliding_window_view(phasors, window_size, axis=-1)
+            out = workspace.buffer('window_sums', n_windows, phasors.dtype) \
+                if workspace is not None else None
+            return windows[..., :n_windows, :].sum(axis=-1, out=out)
+        shape = phasors.shape[:-1] + (phasors.shape[-1] + 1,)
+        if workspace is not None:
+            csum = workspace.buffer('cumsum', shape[0], np.complex128)
+        else:
+            csum = np.empty(shape, dtype=np.complex128)
+        csum[..., 0] = 0.0
+        np.cumsum(phasors, axis=-1, out=csum[..., 1:])
+        out = workspace.buffer('window_sums', n_windows, np.complex128) \
+            if workspace is not None else None
+        return np.subtract(csum[..., window_size:window_size + n_windows], csum[..., :n_windows],
+                           out=out)
+    
     def compute_phase_coherence(self, phase, window_size=5):
         try:
-            # Remove NaN and infinite values
-            phase = np.nan_to_num(phase, nan=0.0, posinf=0.0, neginf=0.0)
             # Ensure phase is valid
             if len(phase) < window_size:
                 return 0.5, np.array([0.5])
+            workspace = self.workspace
             
-            # Compute coherence in sliding windows
-            coherence_bins = []
-            for i in range(len(phase) - window_size):
-                window_phase = phase[i:i+window_size]
-                # Sum phase vectors: Σ exp(j*∠X(k))
-                phase_sum = np.abs(np.sum(np.exp(1j * window_phase)))
-                # Normalize by window size
-                coherence = phase_sum / window_size
-                coherence_bins.append(coherence)
+            # Unit phasors exp(j*∠X(k)), computed once for all windows, with
+            # NaN and infinite phases treated as 0
+            phasors = workspace.buffer('phasors', len(phase), np.result_type(phase, np.complex64))
+            np.multiply(np.nan_to_num(phase, nan=0.0, posinf=0.0, neginf=0.0), 1j, out=phasors)
+            np.exp(phasors, out=phasors)
+            # Coherence per sliding window: |Σ exp(j*∠X(k))| / window_size
+            coherence_bins = np.abs(self._window_sums(phasors, window_size, workspace))
+            coherence_bins /= window_size
             
             # Overall coherence: mean of window coherences
-            overall_coherence = np.mean(coherence_bins) if coherence_bins else 0.5
+            overall_coherence = np.mean(coherence_bins) if len(coherence_bins) else 0.5
             overall_coherence = np.clip(overall_coherence, 0.0, 1.0)
             
-            return overall_coherence, np.array(coherence_bins)
+            return overall_coherence, coherence_bins
         except Exception as e:
             return 0.5, np.array([0.5])
     
     def compute_phase_velocity(self, phase):
-        # Phase difference between adjacent frequency bins
-        phase_velocity = np.diff(phase)
-        phase_velocity = np.angle(np.exp(1j * phase_velocity))
+        # Phase difference between adjacent frequency bins, wrapped to
+        # (-pi, pi] as angle(exp(j*diff)); scratch comes from the workspace
+        workspace = self.workspace
+        n = max(len(phase) - 1, 0)
+        phase_velocity = np.subtract(phase[1:], phase[:-1],
+                                     out=workspace.buffer('velocity', n, phase.dtype))
+        rotation = workspace.buffer('rotation', n, np.result_type(phase, np.complex64))
+        np.exp(np.multiply(phase_velocity, 1j, out=rotation), out=rotation)
+        np.arctan2(rotation.imag, rotation.real, out=phase_velocity)
         # Mean absolute velocity / smoothness metric
-        velocity_smoothness = np.mean(np.abs(phase_velocity))
+        velocity_smoothness = np.mean(np.abs(phase_velocity, out=phase_velocity), dtype=np.float64)
         
         return velocity_smoothness
     
     def compute_spectral_inner_products(self, magnitude):
         # Euclidean norm of magnitude vector
-        l2_norm = np.linalg.norm(magnitude, ord=2)
+        l2_norm = _l2_norm(magnitude)
         # Normalized spectral shape (unit vector for cosine similarity)
         if l2_norm > 0:
             spectral_shape = magnitude / l2_norm
@@ -123,23 +254,35 @@ class AudioSignalProcessor:
             spectral_shape = magnitude
 
         # Spectral entropy
-        prob = (magnitude + 1e-10) / (np.sum(magnitude) + 1e-10)
-        entropy = -np.sum(prob * np.log(prob))
+        # float() keeps prob at the magnitude's precision (a NumPy float64
+        # scalar would promote a float32 array)
+        workspace = self.workspace
+        prob = np.add(magnitude, 1e-10,
+                      out=workspace.buffer('prob', len(magnitude), magnitude.dtype))
+        prob /= float(np.sum(magnitude, dtype=np.float64) + 1e-10)
+        log_prob = np.log(prob, out=workspace.buffer('log_prob', len(prob), prob.dtype))
+        entropy = -np.sum(np.multiply(prob, log_prob, out=log_prob), dtype=np.float64)
         return {
             'l2_norm': l2_norm,
             'spectral_shape': spectral_shape,
             'entropy': entropy
         }
     
-    def extract_all_features(self, filepath):
+    def extract_all_features(self, source):
         # Load signal
-        signal, sr = self.load_wav(filepath)
+        with metrics.stage('decode'):
+            signal, sr = self.load_wav(source)
+        metrics.inc('deepfake_audio_samples_total', len(signal))
         # Spectral features
-        spectral = self.compute_spectral_features(signal, sr)
+        with metrics.stage('fft'):
+            spectral = self.compute_spectral_features(signal, sr)
         # Phase coherence, velocity + Spectral entropy
-        phase_coherence, _ = self.compute_phase_coherence(spectral['phase'])
-        phase_velocity = self.compute_phase_velocity(spectral['phase'])
-        geom = self.compute_spectral_inner_products(spectral['magnitude'])
+        with metrics.stage('coherence'):
+            phase_coherence, _ = self.compute_phase_coherence(spectral['phase'])
+        with metrics.stage('velocity'):
+            phase_velocity = self.compute_phase_velocity(spectral['phase'])
+        with metrics.stage('spectral'):
+            geom = self.compute_spectral_inner_products(spectral['magnitude'])
         
         return {
             'signal': signal,
@@ -152,6 +295,296 @@ class AudioSignalProcessor:
             'spectral_l2_norm': geom['l2_norm'],
             'spectral_shape': geom['spectral_shape']
         }
+    
+    def compute_lean_features(self, signal, features=SCALAR_FEATURES, window_size=5,
+                              normalized_entropy=False):
+        # Only the requested scalar features, without the phase, frequency
+        # or normalized shape arrays of the full path
+        n_fft = next_fast_len(len(signal)) if self.pad_to_fast_len else len(signal)
+        X = self._rfft(signal, n_fft)
+        return self._lean_spectrum_features(X[:n_fft//2], features, window_size,
+                                            normalized_entropy=normalized_entropy)
+    
+    def _lean_spectrum_features(self, X, features=SCALAR_FEATURES, window_size=5,
+                                block_size=LEAN_BLOCK_SIZE, instrument=False,
+                                normalized_entropy=False):
+        # X is overwritten with the unit phasors z = X / |X| (no angle/exp
+        # round trip); the wrapped phase velocity is angle(z[k+1] * conj(z[k])).
+        # Entropy, coherence and velocity are reduced block by block, so
+        # temporaries stay at block_size bins. Matches the full path up to float rounding.
+        # The magnitude and block temporaries are workspace buffers.
+        # normalized_entropy: p = (m + eps) / sum(m + eps), a true distribution
+        # even for near-silent spectra (entropy <= log(n_bins)); the default
+        # keeps the global-mode formula (m + eps) / (sum(m) + eps), which the
+        # reference statistics were built with.
+        stage = metrics.stage if instrument else metrics.null_stage
+        workspace = self.workspace
+        n_bins = len(X)
+        real_dtype = X.real.dtype
+        block_bins = min(block_size, n_bins)
+        result = {}
+        with stage('spectral'):
+            magnitude = np.abs(X, out=workspace.buffer('magnitude', n_bins, real_dtype))
+            if 'spectral_l2_norm' in features:
+                result['spectral_l2_norm'] = _l2_norm(magnitude)
+            if 'spectral_entropy' in features:
+                total = np.sum(magnitude, dtype=np.float64) + \
+                    1e-10 * (n_bins if normalized_entropy else 1)
+                prob_buffer = workspace.buffer('prob', block_bins, real_dtype)
+                log_buffer = workspace.buffer('log_prob', block_bins, real_dtype)
+                entropy = 0.0
+                for start in range(0, n_bins, block_size):
+                    block = magnitude[start:start + block_size]
+                    prob = np.add(block, 1e-10, out=prob_buffer[:len(block)])
+                    prob /= total
+                    log_prob = np.log(prob, out=log_buffer[:len(block)])
+                    entropy -= float(np.sum(np.multiply(prob, log_prob, out=log_prob),
+                                            dtype=np.float64))
+                result['spectral_entropy'] = entropy
+        if 'phase_coherence' not in features and 'phase_velocity' not in features:
+            return result
+        
+        with stage('phasors'):
+            # angle(0) = 0, so empty bins become the phasor 1
+            nonzero = np.greater(magnitude, 0, out=workspace.buffer('nonzero', n_bins, bool))
+            np.divide(X, magnitude, out=X, where=nonzero)
+            np.copyto(X, 1.0, where=np.logical_not(nonzero, out=nonzero))
+            del magnitude
+        
+        if 'phase_velocity' in features:
+            with stage('velocity'):
+                # angle(z[k+1] * conj(z[k])) via arctan2, written into scratch
+                product_buffer = workspace.buffer('product', block_bins, X.dtype)
+                step_buffer = workspace.buffer('step', block_bins, real_dtype)
+                velocity_sum = 0.0
+                for start in range(0, n_bins, block_size):
+                    block = X[start:min(start + block_size + 1, n_bins)]
+                    product = np.conjugate(block[:-1], out=product_buffer[:len(block) - 1])
+                    np.multiply(block[1:], product, out=product)
+                    step = np.arctan2(product.imag, product.real, out=step_buffer[:len(product)])
+                    velocity_sum += float(np.sum(np.abs(step, out=step), dtype=np.float64))
+                result['phase_velocity'] = velocity_sum / (n_bins - 1) if n_bins > 1 else np.nan
+        
+        if 'phase_coherence' in features:
+            with stage('coherence'):
+                n_windows = n_bins - window_size
+                coherence_sum = 0.0
+                for start in range(0, max(n_windows, 0), block_size):
+                    stop = min(start + block_size, n_windows)
+                    window_sums = self._window_sums(X[start:stop + window_size], window_size,
+                                                    workspace)
+                    sums = np.abs(window_sums, out=workspace.buffer(
+                        'window_abs', len(window_sums), window_sums.real.dtype))
+                    coherence_sum += float(np.sum(sums, dtype=np.float64))
+                if n_windows > 0:
+                    coherence = coherence_sum / n_windows / window_size
+                    result['phase_coherence'] = float(np.clip(coherence, 0.0, 1.0))
+                else:
+                    result['phase_coherence'] = 0.5
+        return result
+    
+    def extract_lean_features(self, source, features=SCALAR_FEATURES):
+        with metrics.stage('decode'):
+            signal, sr = self.load_wav(source)
+        n_samples = len(signal)
+        metrics.inc('deepfake_audio_samples_total', n_samples)
+        with metrics.stage('fft'):
+            n_fft = next_fast_len(n_samples) if self.pad_to_fast_len else n_samples
+            X = self._rfft(signal, n_fft)
+        # The signal is not needed once transformed
+        del signal
+        result = self._lean_spectrum_features(X[:n_fft//2], features, instrument=True)
+        result.update({'sr': sr, 'n_samples': n_samples})
+        return result
+    
+    def _batch_fft_length(self, N, length_bucket=None):
+        n_fft = next_fast_len(N) if self.pad_to_fast_len else N
+        if length_bucket:
+            # Round up so clips of similar length share one batched FFT
+            n_fft = -(-n_fft // length_bucket) * length_bucket
+        return n_fft
+    
+    def compute_batch_features(self, stack, window_size=5):
+        # Global-mode scalar features for every row of a (n_signals, n_fft)
+        # array: one batched FFT, then row-wise reductions along the last axis.
+        # Matches extract_all_features row by row for unpadded rows.
+        n_fft = stack.shape[-1]
+        X = self._rfft(stack, n_fft)
+        X = X[:, :n_fft//2]
+        magnitude = np.abs(X)
+        phase = np.angle(X)
+        del X
+        
+        # Phase coherence (same sliding-window phasor sums as the 1-D path)
+        n_rows = len(stack)
+        if phase.shape[-1] - window_size > 0:
+            phasors = np.exp(1j * np.nan_to_num(phase, nan=0.0, posinf=0.0, neginf=0.0))
+            coherence_bins = np.abs(self._window_sums(phasors, window_size))
+            del phasors
+            coherence = np.clip(coherence_bins.mean(axis=-1) / window_size, 0.0, 1.0)
+        else:
+            coherence = np.full(n_rows, 0.5)
+        
+        # Phase velocity: wrapped differences between adjacent bins
+        velocity = np.mean(np.abs(np.angle(np.exp(1j * np.diff(phase, axis=-1)))), axis=-1,
+                           dtype=np.float64)
+        
+        # Spectral entropy and L2 norm
+        l2_norm = _l2_norm(magnitude)
+        totals = np.sum(magnitude, axis=-1, keepdims=True, dtype=np.float64) + 1e-10
+        prob = (magnitude + 1e-10) / totals.astype(magnitude.dtype)
+        entropy = -np.sum(prob * np.log(prob), axis=-1, dtype=np.float64)
+        
+        return {
+            'phase_coherence': coherence,
+            'phase_velocity': velocity,
+            'spectral_entropy': entropy,
+            'spectral_l2_norm': l2_norm
+        }
+    
+    def extract_batch_features(self, sources, batch_size=32, length_bucket=None):
+        # Global-mode features for many clips. Clips with the same transform
+        # length are stacked (up to batch_size rows) and processed together.
+        # length_bucket zero-pads each clip up to a multiple of that many
+        # samples so more clips share a batch; like pad_to_fast_len this
+        # samples a finer frequency grid and shifts the features slightly.
+        # Returns (structured array in input order, {index: error message}).
+        features = np.zeros(len(sources), dtype=BATCH_FEATURE_DTYPE)
+        errors = {}
+        groups = {}
+        for index, source in enumerate(sources):
+            try:
+                signal, sr = self.load_wav(source)
+                if len(signal) == 0:
+                    raise ValueError("Empty audio signal")
+            except Exception as e:
+                errors[index] = str(e)
+                continue
+            features[index]['sr'] = sr
+            features[index]['n_samples'] = len(signal)
+            n_fft = self._batch_fft_length(len(signal), length_bucket)
+            groups.setdefault(n_fft, []).append((index, signal))
+        
+        for name in ('phase_coherence', 'phase_velocity', 'spectral_entropy',
+                     'spectral_l2_norm'):
+            features[name][list(errors)] = np.nan
+        
+        for n_fft, members in groups.items():
+            for start in range(0, len(members), batch_size):
+                rows = members[start:start + batch_size]
+                # Zero padding in the stack is the same padding rfft applies
+                stack = np.zeros((len(rows), n_fft), dtype=self.dtype)
+                for row, (_, signal) in enumerate(rows):
+                    stack[row, :len(signal)] = signal
+                batch = self.compute_batch_features(stack)
+                indices = [index for index, _ in rows]
+                for name, values in batch.items():
+                    features[name][indices] = values
+        
+        return features, errors
+    
+    def iter_frames(self, signal):
+        # Fixed-size frames from an array (views, no copies) or from an
+        # iterable of chunks (rolling buffer, valid until the next frame).
+        # Signals shorter than one frame are analyzed as a single frame.
+        if isinstance(signal, np.ndarray):
+            if len(signal) <= self.frame_size:
+                yield signal
+                return
+            for start in range(0, len(signal) - self.frame_size + 1, self.hop_size):
+                yield signal[start:start + self.frame_size]
+            return
+        
+        buffer = np.empty(self.frame_size, dtype=np.float32)
+        overlap = self.frame_size - self.hop_size
+        filled = 0
+        emitted = False
+        for chunk in signal:
+            pos = 0
+            while pos < len(chunk):
+                take = min(self.frame_size - filled, len(chunk) - pos)
+                buffer[filled:filled + take] = chunk[pos:pos + take]
+                filled += take
+                pos += take
+                if filled == self.frame_size:
+                    yield buffer
+                    emitted = True
+                    buffer[:overlap] = buffer[self.hop_size:]
+                    filled = overlap
+        if not emitted and filled:
+            yield buffer[:filled]
+    
+    def _frame_window(self, length):
+        if self.frame_window is None:
+            return None
+        if self.frame_window == 'hann':
+            # Read-only, cached in the workspace
+            return self.workspace.constant('hann', length,
+                                           lambda: np.hanning(length).astype(np.float32))
+        raise ValueError(f"Unsupported frame window: {self.frame_window}")
+    
+    def frame_sums(self, frames):
+        # Running sums over frames: [coherence, velocity, entropy, energy,
+        # n_frames]. Only one frame spectrum is alive at a time.
+        sums = np.zeros(5)
+        window = None
+        for frame in frames:
+            if window is None or len(window) != len(frame):
+                window = self._frame_window(len(frame))
+            if window is not None:
+                frame = np.multiply(frame, window, out=self.workspace.buffer(
+                    'frame', len(frame), np.result_type(frame, window)))
+            # Framed entropy is normalized: near-silent frames (e.g. MP3
+            # priming, pauses in a stream) would otherwise dominate the mean
+            frame_features = self.compute_lean_features(frame, normalized_entropy=True)
+            sums += (frame_features['phase_coherence'], frame_features['phase_velocity'],
+                     frame_features['spectral_entropy'],
+                     float(frame_features['spectral_l2_norm']) ** 2, 1)
+        return sums
+    
+    def framed_features_from_sums(self, sums, sr):
+        n_frames = int(sums[4])
+        if n_frames == 0:
+            raise ValueError("No audio frames to analyze")
+        return {
+            'sr': sr,
+            'n_frames': n_frames,
+            'phase_coherence': sums[0] / n_frames,
+            'phase_velocity': sums[1] / n_frames,
+            'spectral_entropy': sums[2] / n_frames,
+            'spectral_l2_norm': np.sqrt(sums[3])
+        }
+    
+    def compute_framed_features(self, frames, sr):
+        # Per-frame features aggregated with running sums
+        return self.framed_features_from_sums(self.frame_sums(frames), sr)
+    
+    def extract_framed_features(self, source):
+        # Stream chunks straight into frames, never holding the full signal
+        # (decode and analysis interleave, so they are timed as one stage)
+        with metrics.stage('framed'):
+            sr, chunks = self.iter_chunks(source)
+            n_samples = 0
+            
+            def counted():
+                nonlocal n_samples
+                for chunk in chunks:
+                    n_samples += len(chunk)
+                    yield chunk
+            
+            features = self.compute_framed_features(self.iter_frames(counted()), sr)
+        features['n_samples'] = n_samples
+        return features
+    
+    def extract_features(self, source, mode='global', lean=False):
+        # lean: scalar features only (see compute_lean_features)
+        if mode == 'global':
+            if lean:
+                return self.extract_lean_features(source)
+            return self.extract_all_features(source)
+        if mode == 'framed':
+            return self.extract_framed_features(source)
+        raise ValueError(f"Unknown feature mode: {mode}. Use one of {FEATURE_MODES}.")
 
 
 def extract_features_from_file(filepath):
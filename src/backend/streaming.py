@@ -0,0 +1,204 @@
+"""
+Streaming Detection Module
+Incremental detection over live PCM input: chunks are framed as they arrive
+and a prediction is emitted every emit_interval_ms of audio. Each hop adds one
+frame's features to running sums over the window (the same per-frame math as
+AudioSignalProcessor.compute_framed_features). Sessions need a framed
+detector: global features depend on the analyzed length, so a window scored
+against whole-clip statistics is biased. Session state is bounded by the
+window length and the session limit.
+"""
+
+import time
+import uuid
+import threading
+import numpy as np
+from collections import OrderedDict, deque
+
+SAMPLE_FORMATS = {
+    'int16': (np.dtype('<i2'), 1.0 / 32768),
+    'int32': (np.dtype('<i4'), 1.0 / 2147483648),
+    'float32': (np.dtype('<f4'), None)
+}
+
+# Shortest emit interval; shorter requested intervals are clamped to this
+# and to one hop (the window only gains a frame per hop)
+MIN_EMIT_INTERVAL_MS = 50
+
+
+class SessionLimitError(Exception):
+    pass
+
+
+class StreamingSession:
+    def __init__(self, detector, sample_rate, channels=1, sample_format='int16',
+                 window_seconds=10.0, emit_interval_ms=500, min_seconds=1.0):
+        if detector.feature_mode != 'framed':
+            raise ValueError("Streaming needs a framed detector (framed reference statistics)")
+        if sample_rate <= 0:
+            raise ValueError('sample_rate must be positive')
+        if channels < 1:
+            raise ValueError('channels must be at least 1')
+        if sample_format not in SAMPLE_FORMATS:
+            raise ValueError(f"Unsupported sample format: {sample_format}. "
+                             f"Use one of {list(SAMPLE_FORMATS)}.")
+        processor = detector.processor
+        if processor.resample and sample_rate != processor.target_sr:
+            raise ValueError(f"Reference statistics expect {processor.target_sr} Hz audio, "
+                             f"stream is {sample_rate} Hz")
+        self.detector = detector
+        self.processor = processor
+        self.sample_rate = int(sample_rate)
+        self.channels = int(channels)
+        self.dtype, self.scale = SAMPLE_FORMATS[sample_format]
+        self.window_samples = max(int(window_seconds * sample_rate), 1)
+        emit_interval_ms = max(emit_interval_ms, MIN_EMIT_INTERVAL_MS)
+        self.emit_samples = max(int(emit_interval_ms * sample_rate / 1000), processor.hop_size)
+        self.min_samples = int(min_seconds * sample_rate)
+
+        self.samples_received = 0
+        self._since_emit = 0
+        self._remainder = b''
+        self.latest = None
+        self.lock = threading.Lock()
+        self.last_active = time.monotonic()
+
+        frame_size, hop_size = processor.frame_size, processor.hop_size
+        # Frames whose samples all lie inside the window
+        window_frames = max(1, (self.window_samples - frame_size) // hop_size + 1)
+        self._frames = deque(maxlen=window_frames)
+        self._frame_buffer = np.empty(frame_size, dtype=np.float32)
+        self._frame_filled = 0
+
+    def _decode(self, data):
+        # Interleaved PCM bytes (or an array) -> mono float32
+        if isinstance(data, np.ndarray):
+            samples = data.astype(np.float32, copy=False)
+            if samples.ndim > 1:
+                samples = samples.mean(axis=1, dtype=np.float32)
+            return samples
+        data = self._remainder + bytes(data)
+        frame_bytes = self.dtype.itemsize * self.channels
+        usable = len(data) - len(data) % frame_bytes
+        self._remainder = data[usable:]
+        samples = np.frombuffer(data, dtype=self.dtype, count=usable // self.dtype.itemsize)
+        if self.channels > 1:
+            samples = samples.reshape(-1, self.channels).mean(axis=1, dtype=np.float32)
+        else:
+            samples = samples.astype(np.float32)
+        if self.scale is not None:
+            samples *= self.scale
+        return samples
+
+    def _add_frames(self, samples):
+        # Same rolling frame assembly as AudioSignalProcessor.iter_frames
+        frame_size, hop_size = self.processor.frame_size, self.processor.hop_size
+        buffer = self._frame_buffer
+        pos = 0
+        while pos < len(samples):
+            take = min(frame_size - self._frame_filled, len(samples) - pos)
+            buffer[self._frame_filled:self._frame_filled + take] = samples[pos:pos + take]
+            self._frame_filled += take
+            pos += take
+            if self._frame_filled == frame_size:
+                # Same per-frame features as batch framed mode; frame_sums
+                # windows into scratch and never writes to the buffer
+                sums = self.processor.frame_sums([buffer])
+                self._frames.append(tuple(sums[:4]))
+                buffer[:frame_size - hop_size] = buffer[hop_size:]
+                self._frame_filled = frame_size - hop_size
+
+    def _window_features(self):
+        if not self._frames:
+            return None
+        sums = np.sum(np.array(self._frames, dtype=np.float64), axis=0)
+        return self.processor.framed_features_from_sums(np.append(sums, len(self._frames)),
+                                                        self.sample_rate)
+
+    def _emit(self):
+        features = self._window_features()
+        if features is None:
+            return None
+        result = self.detector.score_features(features)
+        analyzed = min(self.samples_received, self.window_samples)
+        result.update({
+            'time': self.samples_received / self.sample_rate,
+            'window_seconds': analyzed / self.sample_rate,
+            'n_frames': features['n_frames']
+        })
+        self.latest = result
+        return result
+
+    def feed(self, data):
+        # Appends a chunk; returns the predictions emitted while consuming it
+        self.last_active = time.monotonic()
+        samples = self._decode(data)
+        events = []
+        pos = 0
+        # Split at emit boundaries so every emit sees exactly the audio up to it
+        while pos < len(samples):
+            take = min(self.emit_samples - self._since_emit, len(samples) - pos)
+            block = samples[pos:pos + take]
+            self._add_frames(block)
+            self.samples_received += take
+            self._since_emit += take
+            pos += take
+            if self._since_emit >= self.emit_samples:
+                self._since_emit = 0
+                if self.samples_received >= self.min_samples:
+                    event = self._emit()
+                    if event is not None:
+                        events.append(event)
+        return events
+
+    def finish(self):
+        # Final prediction over whatever the window holds
+        self.last_active = time.monotonic()
+        return self._emit() or self.latest
+
+
+class SessionManager:
+    def __init__(self, detector, max_sessions=32, idle_seconds=60.0, **session_defaults):
+        self.detector = detector
+        self.max_sessions = max_sessions
+        self.idle_seconds = idle_seconds
+        self.session_defaults = session_defaults
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        # Caller holds the lock; sessions are kept in last-used order
+        now = time.monotonic()
+        while self._sessions:
+            session_id, session = next(iter(self._sessions.items()))
+            if now - session.last_active < self.idle_seconds:
+                break
+            del self._sessions[session_id]
+
+    def create(self, sample_rate, **options):
+        settings = dict(self.session_defaults, **options)
+        session = StreamingSession(self.detector, sample_rate, **settings)
+        with self._lock:
+            self._expire()
+            if len(self._sessions) >= self.max_sessions:
+                raise SessionLimitError(f'Too many streaming sessions ({self.max_sessions} active)')
+            session_id = uuid.uuid4().hex
+            self._sessions[session_id] = session
+        return session_id, session
+
+    def get(self, session_id):
+        with self._lock:
+            self._expire()
+            session = self._sessions.get(session_id)
+            if session is not None:
+                self._sessions.move_to_end(session_id)
+            return session
+
+    def close(self, session_id):
+        with self._lock:
+            return self._sessions.pop(session_id, None)
+
+    def __len__(self):
+        with self._lock:
+            self._expire()
+            return len(self._sessions)
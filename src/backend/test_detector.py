@@ -0,0 +1,63 @@
+"""
+Detector Tests
+Progressive prediction against full-clip predict() in framed mode.
+"""
+
+import json
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from detector import DeepfakeDetector, SCORED_METRICS
+
+SR = 16000
+
+
+def _write_stats(path, feature_mode):
+    # Minimal reference statistics; the tests compare two code paths, so
+    # the values only need to give non-degenerate scores
+    metrics = {
+        'phase_coherence': {'count': 10, 'mean': 0.2, 'std': 0.02},
+        'phase_velocity': {'count': 10, 'mean': 1.5, 'std': 0.1},
+        'spectral_entropy': {'count': 10, 'mean': 6.0, 'std': 0.3}
+    }
+    shifted = {name: dict(values, mean=values['mean'] * 1.1) for name, values in metrics.items()}
+    stats = {'human': metrics, 'nonhuman': shifted, 'feature_mode': feature_mode,
+             'resample_sr': None}
+    with open(path, 'w') as f:
+        json.dump(stats, f)
+    return str(path)
+
+
+@pytest.fixture
+def framed_detector(tmp_path):
+    return DeepfakeDetector(_write_stats(tmp_path / 'stats.json', 'framed'),
+                            feature_mode='framed')
+
+
+def _write_wav(path, n_samples, seed=0):
+    rng = np.random.default_rng(seed)
+    t = np.arange(n_samples) / SR
+    signal = 0.3 * np.sin(2 * np.pi * 220 * t) + rng.normal(0.0, 0.05, n_samples)
+    wavfile.write(path, SR, (signal * 32767).astype(np.int16))
+    return str(path)
+
+
+# Prefixes grow 1, 2, 4, 8 s: lengths just past a step boundary make the last
+# step shorter than one frame (a tail after full frames, which iter_frames
+# drops); others end mid-step, on a boundary, or within one frame
+@pytest.mark.parametrize('n_samples', [8 * SR + 100, 4 * SR + 1, 10 * SR + 123, 8 * SR,
+                                       3 * SR + 1, 1000])
+def test_complete_framed_prefix_matches_predict(framed_detector, tmp_path, n_samples):
+    path = _write_wav(tmp_path / 'clip.wav', n_samples)
+    expected = framed_detector.predict(path)
+    # A threshold above 1 never exits early, so the prefix grows to the end
+    result = framed_detector.predict_progressive(path, confidence_threshold=1.1,
+                                                 strategy='prefix', min_seconds=1.0)
+    assert result['stop_reason'] == 'complete'
+    # Scored features only: segment reads scale integer PCM by full scale
+    # rather than the peak, which changes the L2 norm and float32 rounding
+    for name in SCORED_METRICS + ('confidence',):
+        assert result[name] == pytest.approx(expected[name], rel=1e-6), name
+    assert result['prediction'] == expected['prediction']
@@ -0,0 +1,102 @@
+"""
+Signal Processor Tests
+Regression tests for the vectorized sliding-window phase coherence against the
+original per-window loop, and for framed entropy on near-silent frames.
+"""
+
+import numpy as np
+import pytest
+
+from signal_processor import AudioSignalProcessor
+
+WINDOW_SIZES = (1, 5, 16, 17, 64)
+# Short, odd and workspace-sized (> MIN_BUFFER_BYTES of phasors) lengths
+LENGTHS = (1, 2, 3, 17, 63, 64, 65, 129, 1001, 20001)
+
+
+def loop_phase_coherence(phase, window_size=5):
+    # Original per-window implementation, kept as the oracle
+    phase = np.nan_to_num(phase, nan=0.0, posinf=0.0, neginf=0.0)
+    if len(phase) < window_size:
+        return 0.5, np.array([0.5])
+    coherence_bins = []
+    for i in range(len(phase) - window_size):
+        window_phase = phase[i:i + window_size]
+        phase_sum = np.abs(np.sum(np.exp(1j * window_phase)))
+        coherence_bins.append(phase_sum / window_size)
+    overall_coherence = np.mean(coherence_bins) if coherence_bins else 0.5
+    overall_coherence = np.clip(overall_coherence, 0.0, 1.0)
+    return overall_coherence, np.array(coherence_bins)
+
+
+@pytest.fixture(scope='module')
+def processor():
+    return AudioSignalProcessor()
+
+
+@pytest.mark.parametrize('window_size', WINDOW_SIZES)
+@pytest.mark.parametrize('length', LENGTHS)
+def test_phase_coherence_matches_loop(processor, window_size, length):
+    rng = np.random.default_rng(length * 100 + window_size)
+    # Partly coherent phases, so window sums are neither ~0 nor ~window_size
+    phase = np.cumsum(rng.normal(0.0, 0.8, length)) + rng.uniform(-np.pi, np.pi)
+    expected, expected_bins = loop_phase_coherence(phase, window_size)
+    overall, bins = processor.compute_phase_coherence(phase, window_size)
+    # bins may be a workspace buffer, valid only until the next call
+    bins = np.array(bins)
+    assert bins.shape == expected_bins.shape
+    np.testing.assert_allclose(bins, expected_bins, rtol=1e-9, atol=1e-12)
+    assert overall == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('window_size', WINDOW_SIZES)
+def test_phase_coherence_non_finite(processor, window_size):
+    phase = np.linspace(-3.0, 3.0, 101)
+    phase[[0, 7, 50]] = [np.nan, np.inf, -np.inf]
+    expected, expected_bins = loop_phase_coherence(phase, window_size)
+    overall, bins = processor.compute_phase_coherence(phase, window_size)
+    np.testing.assert_allclose(np.array(bins), expected_bins, rtol=1e-9, atol=1e-12)
+    assert overall == pytest.approx(expected, rel=1e-9, abs=1e-12)
+
+
+@pytest.mark.parametrize('window_size', WINDOW_SIZES)
+def test_window_sums_batched_rows(processor, window_size):
+    # 2-D input (batched path): each row matches the loop on its own
+    rng = np.random.default_rng(window_size)
+    phase = rng.uniform(-np.pi, np.pi, (3, 257))
+    sums = processor._window_sums(np.exp(1j * phase), window_size)
+    for row, row_sums in zip(phase, sums):
+        _, expected_bins = loop_phase_coherence(row, window_size)
+        np.testing.assert_allclose(np.abs(row_sums) / window_size, expected_bins,
+                                   rtol=1e-9, atol=1e-12)
+
+
+def test_framed_entropy_near_silent_frame(processor):
+    # A near-silent frame (e.g. MP3 priming) must not dominate the framed
+    # entropy mean: normalized entropy is bounded by log(n_bins)
+    rng = np.random.default_rng(0)
+    frame_size = processor.frame_size
+    silent = rng.normal(0.0, 1e-14, frame_size).astype(np.float32)
+    speech = rng.normal(0.0, 0.1, 20 * frame_size).astype(np.float32)
+    n_bins = frame_size // 2
+    entropy = processor.frame_sums([silent])[2]
+    assert 0.0 < entropy <= np.log(n_bins) + 1e-9
+
+    frames = list(processor.iter_frames(speech))
+    clean = processor.framed_features_from_sums(processor.frame_sums(frames), 16000)
+    primed = processor.framed_features_from_sums(
+        processor.frame_sums([silent] + frames), 16000)
+    assert primed['spectral_entropy'] <= np.log(n_bins)
+    assert primed['spectral_entropy'] == pytest.approx(clean['spectral_entropy'], rel=0.05)
+
+
+def test_global_entropy_formula_unchanged(processor):
+    # Global mode keeps the (m + eps) / (sum(m) + eps) formula of the
+    # reference statistics
+    rng = np.random.default_rng(1)
+    signal = rng.normal(0.0, 0.1, 4096)
+    magnitude = np.abs(np.fft.rfft(signal)[:2048])
+    prob = (magnitude + 1e-10) / (np.sum(magnitude) + 1e-10)
+    expected = -np.sum(prob * np.log(prob))
+    entropy = processor.compute_lean_features(signal)['spectral_entropy']
+    assert entropy == pytest.approx(expected, rel=1e-9)
@@ -0,0 +1,40 @@
+"""
+Streaming Tests
+Final streamed prediction against full-clip predict() in framed mode.
+"""
+
+import numpy as np
+import pytest
+from scipy.io import wavfile
+
+from detector import DeepfakeDetector, SCORED_METRICS
+from streaming import StreamingSession
+from test_detector import SR, _write_stats, _write_wav, framed_detector  # noqa: F401
+
+
+# Clips no longer than the default 10 s window, so the final window holds
+# every frame predict() analyzes
+@pytest.mark.parametrize('n_samples', [10 * SR, 6 * SR + 777, 2 * SR + 1])
+@pytest.mark.parametrize('chunk_samples', [4000, 16384])
+def test_streamed_clip_matches_predict(framed_detector, tmp_path, n_samples, chunk_samples):
+    path = _write_wav(tmp_path / 'clip.wav', n_samples)
+    expected = framed_detector.predict(path)
+    _, pcm = wavfile.read(path)
+    session = StreamingSession(framed_detector, SR, sample_format='int16')
+    data = pcm.tobytes()
+    chunk_bytes = chunk_samples * pcm.itemsize
+    for start in range(0, len(data), chunk_bytes):
+        session.feed(data[start:start + chunk_bytes])
+    result = session.finish()
+    assert result['window_seconds'] == pytest.approx(n_samples / SR)
+    for name in SCORED_METRICS + ('confidence',):
+        assert result[name] == pytest.approx(expected[name], rel=1e-6), name
+    assert result['prediction'] == expected['prediction']
+
+
+def test_global_detector_rejected(tmp_path):
+    # Global features depend on the analyzed length, so a rolling window
+    # would not be scored like predict() on the same audio
+    detector = DeepfakeDetector(_write_stats(tmp_path / 'stats.json', 'global'))
+    with pytest.raises(ValueError):
+        StreamingSession(detector, SR)
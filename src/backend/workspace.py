@@ -0,0 +1,88 @@
+"""
+Workspace Module
+Per-thread cache of frequency axes, analysis windows and scratch buffers for
+repeated transforms. Scratch buffers (from MIN_BUFFER_BYTES up) are kept one
+per name and grown to the largest length requested; constants are keyed by
+name and length. Entries are evicted least-recently-used once the cache
+exceeds its byte budget. A workspace is not thread-safe;
+AudioSignalProcessor keeps one per thread.
+"""
+
+import numpy as np
+from collections import OrderedDict
+
+DEFAULT_WORKSPACE_BYTES = 16 * 1024 * 1024
+# Smaller scratch arrays are allocated fresh: malloc serves them from its free
+# lists without page faults, which is cheaper than a cache lookup (glibc's
+# default mmap threshold)
+MIN_BUFFER_BYTES = 128 * 1024
+
+
+class Workspace:
+    def __init__(self, max_bytes=DEFAULT_WORKSPACE_BYTES, min_buffer_bytes=MIN_BUFFER_BYTES):
+        self.max_bytes = max_bytes
+        self.min_buffer_bytes = min_buffer_bytes
+        self._entries = OrderedDict()    # key -> array
+        self.nbytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, key, length, factory):
+        # Cached array with at least `length` elements, or a new one from
+        # factory() (which replaces a shorter cached array under the same key)
+        array = self._entries.get(key)
+        if array is not None and len(array) >= length:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return array
+        self.misses += 1
+        if array is not None:
+            del self._entries[key]
+            self.nbytes -= array.nbytes
+        array = factory()
+        if array.nbytes > self.max_bytes:
+            # Larger than the whole budget: used once, never cached
+            return array
+        self._entries[key] = array
+        self.nbytes += array.nbytes
+        while self.nbytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.nbytes -= evicted.nbytes
+        return array
+
+    def buffer(self, name, length, dtype):
+        # Uninitialized scratch array of `length` elements (a view of the
+        # cached buffer); only valid until the next request for `name`
+        dtype = np.dtype(dtype)
+        if length * dtype.itemsize < self.min_buffer_bytes:
+            return np.empty(length, dtype=dtype)
+        array = self._get(('buffer', name, dtype.str), length,
+                          lambda: np.empty(length, dtype=dtype))
+        return array[:length]
+
+    def constant(self, name, length, factory):
+        # Read-only array built once by factory(), e.g. a frequency axis
+        def build():
+            array = factory()
+            array.setflags(write=False)
+            return array
+        return self._get(('constant', name, length), 0, build)
+
+    def freq(self, n_fft, sr):
+        # Positive-frequency axis (Hz) of an n_fft-point transform
+        return self.constant(f'freq@{sr}', n_fft,
+                             lambda: np.fft.rfftfreq(n_fft, d=1 / sr)[:n_fft // 2])
+
+    def clear(self):
+        self._entries.clear()
+        self.nbytes = 0
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'min_buffer_bytes': self.min_buffer_bytes,
+            'bytes': self.nbytes,
+            'max_bytes': self.max_bytes,
+            'hits': self.hits,
+            'misses': self.misses
+        }
@@ -0,0 +1,13 @@
+"""
+WSGI Entry Point for production servers
+The detector is loaded at import time, so with gunicorn --preload (see
+gunicorn.conf.py) it is built once in the master process and shared
+copy-on-write by the forked workers.
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+    waitress-serve --threads 8 wsgi:app      (Windows, threads only)
+"""
+
+from app import create_app
+
+app = create_app()